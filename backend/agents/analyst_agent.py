@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from services.integration_service import get_integration_client
 from services.rag_service import rag_service
 
@@ -6,7 +6,7 @@ class AnalystAgent:
     def __init__(self):
         self.integration_client = get_integration_client()
 
-    def import_requirements(self, query: str = "") -> List[Dict]:
+    def import_requirements(self, query: str = "", workspace_id: Optional[str] = None) -> List[Dict]:
         """Fetches requirements, summarizes them, and stores in RAG."""
         
         # 1. Fetch from source
@@ -23,7 +23,8 @@ class AnalystAgent:
             doc_id = rag_service.ingest_document(
                 content=req["content"],
                 title=req["title"],
-                source="Jira/Confluence" # In a real app, this would be the URL
+                source="Jira/Confluence", # In a real app, this would be the URL
+                workspace_id=workspace_id
             )
             
             imported_docs.append({
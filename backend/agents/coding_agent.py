@@ -1,38 +1,54 @@
 import os
 import subprocess
 import logging
-from typing import List, Dict, Optional
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 
-from services.rag_service import rag_service
-from services.llm_factory import get_llm
+from services.llm_factory import llm_gateway
 from services.git_service import git_service
+from services.code_validator import code_validator
+from services.test_selector import test_selector
+from services.tracing import tracer
+from agents.task_context import TaskContext, SYSTEM_PROMPT
 
 logger = logging.getLogger(__name__)
 
 class CodingAgent:
-    def __init__(self):
-        self.llm = get_llm()
-
-    def run_task(self, task: str, repo_path: str) -> str:
-        """Executes a coding task end-to-end."""
+    def run_task(self, task: str, repo_path: str, workspace_id: Optional[str] = None) -> Dict:
+        """Executes a coding task end-to-end. LLM calls are budgeted under `workspace_id`."""
         logger.info(f"Starting task: {task}")
         
-        # 1. Retrieve Context
-        context_docs = rag_service.query_knowledge(task, k=3)
-        context_text = "\n\n".join([f"Source: {d['title']}\nContent:\n{d['full_content']}" for d in context_docs])
+        # 1. Retrieve Context (once per task; steps reuse it)
+        context = TaskContext(task, k=3, workspace_id=workspace_id)
         
         # 2. Plan
-        plan = self._create_plan(task, context_text)
+        plan = self._create_plan(task, context, repo_path)
         logger.info(f"Plan created: {plan}")
         
         # 3. Execute Plan
         for step in plan:
             logger.info(f"Executing step: {step}")
-            self._execute_step(step, context_text, repo_path)
-            
-        # 4. Final Commit & PR Simulation
+            self._execute_step(step, context, repo_path)
+
+        # 4. Full suite, sharded across workers; any failure stops the task before committing
+        test_files = test_selector.find_test_files(repo_path)
+        shards = test_selector.shard(test_files, repo_path)
+        failures = []
+        for shard, success, output in self._run_tests(shards, repo_path):
+            if not success:
+                logger.warning(f"Full suite shard {shard} failed: {output}")
+                failures.append(f"Tests failed ({', '.join(shard)}):\n{output}")
+        if failures:
+            return {
+                "success": False,
+                "message": f"Task failed: {len(failures)} test shard(s) failed. Changes were not committed.",
+                "pr_url": None,
+                "logs": [f"Plan: {step}" for step in plan] + failures
+            }
+
+        # 5. Final Commit & PR Simulation
         branch_name = f"feature/{task.lower().replace(' ', '-')}"
         # Ensure we are on main/master first or just branch off current? 
         # For simplicity, we assume we are at a clean state or just create branch.
@@ -44,92 +60,107 @@ class CodingAgent:
         simulated_pr_url = f"https://github.com/hsbc/trading-engine/pull/new/{branch_name}"
         logger.info(f"PR Created Simulation: {simulated_pr_url}")
         
-        return f"Task completed successfully. PR created: {simulated_pr_url}"
+        return {
+            "success": True,
+            "message": f"Task completed successfully. PR created: {simulated_pr_url}",
+            "pr_url": simulated_pr_url,
+            "logs": [f"Plan: {step}" for step in plan]
+        }
 
-    def _create_plan(self, task: str, context: str) -> List[str]:
+    @tracer.traced("agent.create_plan")
+    def _create_plan(self, task: str, context: TaskContext, repo_path: str) -> List[str]:
         """Generates a list of implementation steps."""
         prompt = PromptTemplate.from_template(
-            """
-            You are a senior software engineer. Create a implementation plan for the following task based on the provided context.
+            """{prefix}
+
+            Create a implementation plan for the following task based on the provided context.
             Return ONLY a list of steps, one per line.
             Each step should be a clear instruction like "Create file src/market_data.py with MarketDataProvider class".
             
-            Task: {task}
-            
             Context:
             {context}
             
+            Task: {task}
+            
             Plan:
             """
         )
-        chain = prompt | self.llm | StrOutputParser()
-        result = chain.invoke({"task": task, "context": context})
+        # The workspace id keys the per-workspace LLM limits
+        result = llm_gateway.invoke(prompt.format(prefix=context.prefix, task=task, context=context.full_context()), workspace_id=context.workspace_id)
         return [line.strip() for line in result.split("\n") if line.strip() and not line.startswith("#")]
 
-    def _execute_step(self, step: str, context: str, repo_path: str):
+    def _execute_step(self, step: str, context: TaskContext, repo_path: str):
         """Generates code and tests for a single step, verifies, and fixes if needed."""
         
         # 1. Generate Code
-        code_files = self._generate_code(step, context)
+        code_files = self._generate_code(step, context, repo_path)
         
         # 2. Write Files
-        for filepath, content in code_files.items():
-            if not self._is_safe_path(filepath, repo_path):
-                logger.error(f"Attempted to write to unsafe path: {filepath}")
-                continue
-            full_path = os.path.join(repo_path, filepath)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, "w") as f:
-                f.write(content)
+        with tracer.span("agent.write_files", files=len(code_files)):
+            for filepath, content in code_files.items():
+                if not self._is_safe_path(filepath, repo_path):
+                    logger.error(f"Attempted to write to unsafe path: {filepath}")
+                    continue
+                full_path = os.path.join(repo_path, filepath)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "w") as f:
+                    f.write(content)
+
+        # 3. Static validation: syntax, imports and undefined names are fixed without a test run
+        with tracer.span("agent.validate") as span:
+            diagnostics = code_validator.validate(code_files, repo_path)
+            if diagnostics:
+                span["outcome"] = "failed"
+        if diagnostics:
+            error = code_validator.format_diagnostics(diagnostics)
+            logger.warning(f"Static validation failed: {error}. Attempting fix...")
+            self._fix_code(step, context, code_files, error, repo_path)
+            return
                 
-        # 3. Verify (Run Tests)
-        # Assuming the step generated a test file, or we run existing tests
-        # For simplicity in this MVP, we look for 'test' in the filename to run it
-        test_files = [f for f in code_files.keys() if "test" in f or "tests/" in f]
-        
-        for test_file in test_files:
-            logger.info(f"Running test: {test_file}")
-            success, output = self._run_test(test_file, repo_path)
-            
-            if not success:
-                logger.warning(f"Test failed: {output}. Attempting fix...")
-                # 4. Fix if failed
-                self._fix_code(step, context, code_files, output, repo_path)
+        # 4. Verify (Run Tests)
+        # Run every test module that transitively imports a file written in this step,
+        # so regressions in earlier tests are caught as well as the new ones
+        written = [f for f in code_files.keys() if self._is_safe_path(f, repo_path)]
+        test_files = test_selector.select_tests(repo_path, written)
+        logger.info(f"Running impacted tests: {test_files}")
 
-    def _generate_code(self, step: str, context: str) -> Dict[str, str]:
+        failures = [output for _, success, output in self._run_tests([[f] for f in test_files], repo_path) if not success]
+        if failures:
+            error = "\n\n".join(failures)
+            logger.warning(f"Test failed: {error}. Attempting fix...")
+            # 5. Fix if failed
+            self._fix_code(step, context, code_files, error, repo_path)
+
+    @tracer.traced("agent.generate_code")
+    def _generate_code(self, step: str, context: TaskContext, repo_path: str) -> Dict[str, str]:
         """Generates code files (source and test) for a step."""
         prompt = PromptTemplate.from_template(
-            """
-            You are an expert Python developer.
-            Write the code to accomplish the following step: {step}
-            Use the context provided.
+            """{prefix}
+
+            Write the code to accomplish the step below, using the specifications provided.
             
             You must provide TWO files:
             1. The implementation file (e.g., src/module.py)
             2. A corresponding test file (e.g., tests/test_module.py) using `unittest`.
             
-            Output format:
-            FILE: <filepath>
-            <code content>
-            END_FILE
-            
-            FILE: <filepath>
-            <code content>
-            END_FILE
-            
-            Context:
+            Specifications for this step:
             {context}
+            
+            Step: {step}
             """
         )
-        chain = prompt | self.llm | StrOutputParser()
-        result = chain.invoke({"step": step, "context": context})
+        # Only the specifications relevant to this step follow the shared prefix
+        result = llm_gateway.invoke(prompt.format(prefix=context.prefix, step=step, context=context.step_context(step)), workspace_id=context.workspace_id)
         return self._parse_files(result)
 
-    def _fix_code(self, step: str, context: str, code_files: Dict[str, str], error: str, repo_path: str):
+    @tracer.traced("agent.fix_code")
+    def _fix_code(self, step: str, context: TaskContext, code_files: Dict[str, str], error: str, repo_path: str):
         """Fixes code based on error output."""
         prompt = PromptTemplate.from_template(
-            """
+            """{prefix}
+
             The following code failed its test. Fix the implementation and/or the test.
+            Output only the files that change.
             
             Step: {step}
             
@@ -138,19 +169,13 @@ class CodingAgent:
             
             Error Output:
             {error}
-            
-            Output format:
-            FILE: <filepath>
-            <code content>
-            END_FILE
-            ...
             """
         )
         # Format code_files for prompt
         files_str = "\n".join([f"File: {k}\nContent:\n{v}" for k, v in code_files.items()])
         
-        chain = prompt | self.llm | StrOutputParser()
-        result = chain.invoke({"step": step, "code_files": files_str, "error": error})
+        # The code and error are all a fix needs; only the system text is shared with other prompts
+        result = llm_gateway.invoke(prompt.format(prefix=SYSTEM_PROMPT, step=step, code_files=files_str, error=error), workspace_id=context.workspace_id)
         new_files = self._parse_files(result)
         
         # Overwrite files
@@ -184,23 +209,37 @@ class CodingAgent:
         except ValueError:
             return False
 
-    def _run_test(self, test_file: str, repo_path: str) -> (bool, str):
-        """Runs a specific test file using python -m unittest."""
-        # Convert path to module format if needed, but simple file run works for standalone
-        # Ideally: python -m unittest tests/test_foo.py
-        if not self._is_safe_path(test_file, repo_path):
-            return False, f"Invalid or unsafe test file path: {test_file}"
+    def _run_tests(self, shards: List[List[str]], repo_path: str) -> List[Tuple[List[str], bool, str]]:
+        """Runs each shard of test files in its own process, in parallel across CPU cores."""
+        if not shards:
+            return []
+        # Each worker runs in a copy of the caller's context so its spans join the current trace
+        contexts = [contextvars.copy_context() for _ in shards]
+        with ThreadPoolExecutor(max_workers=min(len(shards), os.cpu_count() or 1)) as executor:
+            results = list(executor.map(lambda ctx, shard: ctx.run(self._run_test, shard, repo_path), contexts, shards))
+        return [(shard, success, output) for shard, (success, output) in zip(shards, results)]
 
-        try:
-            # We run from repo root
-            cmd = ["python3", "-m", "unittest", test_file]
-            result = subprocess.run(cmd, cwd=repo_path, capture_output=True, text=True)
-            if result.returncode == 0:
-                return True, result.stdout
-            else:
-                return False, result.stderr + "\n" + result.stdout
-        except Exception as e:
-            return False, str(e)
+    def _run_test(self, test_file, repo_path: str) -> (bool, str):
+        """Runs a test file (or a list of them) using python -m unittest."""
+        # unittest accepts file paths and converts them to module names itself
+        test_files = [test_file] if isinstance(test_file, str) else list(test_file)
+        for f in test_files:
+            if not self._is_safe_path(f, repo_path):
+                return False, f"Invalid or unsafe test file path: {f}"
+
+        with tracer.span("agent.run_test", files=len(test_files)) as span:
+            try:
+                # We run from repo root
+                cmd = ["python3", "-m", "unittest"] + test_files
+                result = subprocess.run(cmd, cwd=repo_path, capture_output=True, text=True)
+                if result.returncode == 0:
+                    return True, result.stdout
+                else:
+                    span["outcome"] = "failed"
+                    return False, result.stderr + "\n" + result.stdout
+            except Exception as e:
+                span["outcome"] = "failed"
+                return False, str(e)
 
     def _parse_files(self, text: str) -> Dict[str, str]:
         """Parses the LLM output into a dictionary of filename -> content."""
@@ -0,0 +1,161 @@
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.prompts import PromptTemplate
+
+from config import config
+from services.rag_service import rag_service
+from services.llm_factory import llm_gateway
+from services.reranker import reranker
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Identical at the start of every coding prompt so provider-side prompt caching can reuse it
+SYSTEM_PROMPT = """You are an expert Python developer implementing a task in an existing repository.
+Source files live under src/ and unittest test files under tests/.
+Whenever you output files, use exactly this format:
+FILE: <filepath>
+<code content>
+END_FILE"""
+
+# Smoothing constant for reciprocal rank fusion
+RRF_K = 60
+
+class TaskContext:
+    """Retrieval and prompt context for one coding task.
+
+    Knowledge is retrieved once for the task, and once more per step with the step text. Each
+    step gets the full specifications of only the most relevant documents from both retrievals,
+    ranked against the step's embedding. Embeddings and retrievals are memoized for the lifetime
+    of the task. Generation prompts start with the same prefix (system text plus the task's
+    document summaries) and put call-specific text last.
+
+    In "multi" retrieval mode the task is first expanded into sub-queries, so compound tasks
+    also pull in the specs of the modules they depend on (see `retrieve_multi`).
+    """
+
+    def __init__(self, task: str, k: int = 3, step_k: int = 1, mode: Optional[str] = None, workspace_id: Optional[str] = None):
+        self.task = task
+        self.step_k = step_k
+        self.mode = mode or config.RETRIEVAL_MODE
+        self.workspace_id = workspace_id
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._retrievals: Dict[Tuple[str, int], List[Dict]] = {}
+        self._step_documents: Dict[str, List[Dict]] = {}
+        if self.mode == "multi":
+            self.documents = self.retrieve_multi(task, k)
+        else:
+            self.documents = self.retrieve(task, k)
+        self.prefix = self._build_prefix()
+
+    def embed(self, text: str) -> np.ndarray:
+        if text not in self._embeddings:
+            self._embeddings[text] = np.asarray(rag_service.embed_query(text), dtype=np.float32)
+        return self._embeddings[text]
+
+    def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        """Like `embed` for several texts; the ones not cached yet are embedded in one batch."""
+        missing = [t for t in dict.fromkeys(texts) if t not in self._embeddings]
+        if missing:
+            for text, vector in zip(missing, rag_service.embed_queries(missing)):
+                self._embeddings[text] = np.asarray(vector, dtype=np.float32)
+        return [self._embeddings[t] for t in texts]
+
+    def retrieve(self, query: str, k: int) -> List[Dict]:
+        key = (query, k)
+        if key not in self._retrievals:
+            self._retrievals[key] = rag_service.query_by_vector(self.embed(query).tolist(), k=k)
+        return self._retrievals[key]
+
+    @tracer.traced("agent.retrieve_multi")
+    def retrieve_multi(self, task: str, k: int) -> List[Dict]:
+        """Retrieves for the task plus its sub-queries in one batched embedding and search pass.
+
+        Per-query results are merged by reciprocal rank fusion (deduplicating documents found by
+        several queries), the top candidates are reranked against the task by the cross-encoder,
+        and at most RETRIEVAL_MAX_DOCUMENTS are kept.
+        """
+        queries = [task] + self.expand_queries(task)
+        vectors = self.embed_many(queries)
+        results = rag_service.query_by_vectors([v.tolist() for v in vectors], k=k)
+        for query, documents in zip(queries, results):
+            self._retrievals[(query, k)] = documents
+
+        candidates = self._fuse(results)[:config.RERANK_CANDIDATES]
+        documents = reranker.rerank(task, candidates)[:config.RETRIEVAL_MAX_DOCUMENTS]
+        logger.info(f"Multi-query retrieval for '{task}' ({len(queries)} queries): {[d['title'] for d in documents]}")
+        return documents
+
+    @tracer.traced("agent.expand_queries")
+    def expand_queries(self, task: str) -> List[str]:
+        """Asks the LLM for short search queries covering what the task depends on; [] on failure."""
+        prompt = PromptTemplate.from_template(
+            """
+            Write {n} short search queries for finding the specifications needed to implement the task below.
+            Cover each module or concept the task depends on, one query per line, with no numbering or commentary.
+
+            Task: {task}
+
+            Queries:
+            """
+        )
+        try:
+            result = llm_gateway.invoke(prompt.format(n=config.RETRIEVAL_SUBQUERIES, task=task), workspace_id=self.workspace_id)
+        except Exception as e:
+            logger.warning(f"Query expansion failed, retrieving with the task only: {e}")
+            return []
+
+        queries = []
+        for line in result.splitlines():
+            query = re.sub(r"^\s*(?:[-*]|\d+[.)])\s*", "", line).strip().strip('"')
+            if query and query != task and query not in queries:
+                queries.append(query)
+        return queries[:config.RETRIEVAL_SUBQUERIES]
+
+    def _fuse(self, results: List[List[Dict]]) -> List[Dict]:
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Dict] = {}
+        for ranking in results:
+            for rank, document in enumerate(ranking):
+                key = document["id"] or document["title"]
+                scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+                documents.setdefault(key, document)
+        return [documents[key] for key in sorted(scores, key=lambda key: scores[key], reverse=True)]
+
+    def _build_prefix(self) -> str:
+        summaries = "\n\n".join([f"Source: {d['title']}\nSummary:\n{d['summary']}" for d in self.documents])
+        return f"{SYSTEM_PROMPT}\n\nProject knowledge (summaries):\n{summaries}"
+
+    def full_context(self) -> str:
+        """Full specifications of every document retrieved for the task (used for planning)."""
+        return self._format(self.documents)
+
+    def step_documents(self, step: str) -> List[Dict]:
+        """The documents most relevant to a step, by cosine similarity to the step text.
+
+        Candidates are the task's documents plus a narrow retrieval for the step itself, so a
+        step can use a spec that missed the task-level top k.
+        """
+        if step not in self._step_documents:
+            candidates = {}
+            for document in self.documents + self.retrieve(step, self.step_k):
+                candidates.setdefault(document["id"] or document["title"], document)
+            documents = list(candidates.values())
+            if not documents:
+                return []
+            query = self.embed(step)
+            vectors = np.array([d["embedding"] for d in documents], dtype=np.float32)
+            scores = vectors @ query / np.clip(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12, None)
+            ranked = np.argsort(-scores)[:self.step_k]
+            self._step_documents[step] = [documents[i] for i in ranked]
+            logger.info(f"Step context for '{step}': {[d['title'] for d in self._step_documents[step]]}")
+        return self._step_documents[step]
+
+    def step_context(self, step: str) -> str:
+        return self._format(self.step_documents(step))
+
+    def _format(self, documents: List[Dict]) -> str:
+        return "\n\n".join([f"Source: {d['title']}\nContent:\n{d['full_content']}" for d in documents])
@@ -0,0 +1,125 @@
+"""Compares embedding backends on the requirement corpus.
+
+Each backend runs in its own subprocess so load time and peak RSS are measured in isolation.
+Reports load time, embedding throughput, peak RSS, recall@k for a set of labelled queries,
+and how closely each backend's vectors agree with the HuggingFace (PyTorch) baseline.
+
+Usage (from backend/):
+    python -m benchmarks.embeddings --output embeddings.json
+"""
+import re
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import config
+from services.integration_service import MockIntegrationClient
+
+# (query, id of the requirement that answers it)
+LABELLED_QUERIES = [
+    ("parse prices from a CSV market data feed", "REQ-001"),
+    ("subscribe a callback to price updates", "REQ-001"),
+    ("withdraw raises insufficient funds", "REQ-002"),
+    ("account balance and positions", "REQ-002"),
+    ("simple moving average buy and sell signals", "REQ-003"),
+    ("strategy window size parameter", "REQ-003"),
+    ("engine wires market data, strategy and account together", "REQ-004"),
+    ("main entry point runs a simulation", "REQ-004"),
+]
+
+def load_corpus() -> List[Dict]:
+    return MockIntegrationClient().fetch_requirements("")
+
+def chunk(corpus: List[Dict]) -> List[str]:
+    """Paragraph-sized pieces, closer to what bulk ingestion embeds than whole documents."""
+    return [p.strip() for r in corpus for p in r["content"].split("\n\n") if p.strip()]
+
+def worker(backend: str, rounds: int) -> Dict:
+    start = time.perf_counter()
+    config.EMBEDDING_BACKEND = backend
+    from services.llm_factory import get_embeddings
+    embeddings = get_embeddings()
+    load_seconds = time.perf_counter() - start
+
+    corpus = load_corpus()
+    chunks = chunk(corpus)
+    embeddings.embed_documents(chunks[:2])  # Warm-up
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        embeddings.embed_documents(chunks)
+    embed_seconds = time.perf_counter() - start
+
+    doc_vectors = np.array(embeddings.embed_documents([r["content"] for r in corpus]))
+    query_vectors = np.array(embeddings.embed_documents([q for q, _ in LABELLED_QUERIES]))
+    ranking = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)
+    ids = [r["id"] for r in corpus]
+
+    def recall(k: int) -> float:
+        hits = [expected in [ids[i] for i in ranking[n][:k]] for n, (_, expected) in enumerate(LABELLED_QUERIES)]
+        return sum(hits) / len(hits)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "chunks_per_sec": len(chunks) * rounds / embed_seconds,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "recall_at_1": recall(1),
+        "recall_at_3": recall(3),
+        "doc_vectors": doc_vectors.tolist()
+    }
+
+def run_worker(backend: str, rounds: int) -> Dict:
+    """Runs one backend in a subprocess; a backend that fails (e.g. no model) reports its error."""
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.embeddings", "--worker", backend, "--rounds", str(rounds)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        # The last exception line of the traceback, e.g. the model download failure
+        errors = [line for line in result.stderr.splitlines() if re.match(r"^[\w.]+(Error|Exception)\b", line)]
+        return {"backend": backend, "error": errors[-1] if errors else f"exit status {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare embedding backends on the requirement corpus.")
+    parser.add_argument("--backends", nargs="*", default=["huggingface", "onnx"], choices=["huggingface", "onnx"])
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the chunked corpus for throughput.")
+    parser.add_argument("--output", help="Write results JSON here instead of stdout.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        sys.stdout.write(json.dumps(worker(args.worker, args.rounds)) + "\n")
+        return 0
+
+    results = {backend: run_worker(backend, args.rounds) for backend in args.backends}
+
+    # Agreement with the PyTorch baseline: mean cosine between the same documents' vectors
+    if "doc_vectors" in results.get("huggingface", {}):
+        baseline = np.array(results["huggingface"]["doc_vectors"])
+        for backend, result in results.items():
+            if "doc_vectors" in result:
+                vectors = np.array(result["doc_vectors"])
+                result["mean_cosine_vs_huggingface"] = float(np.mean(np.sum(baseline * vectors, axis=1)))
+    for result in results.values():
+        result.pop("doc_vectors", None)
+
+    report = {"model": config.EMBEDDING_MODEL, "onnx_file": config.EMBEDDING_ONNX_FILE, "rounds": args.rounds, "results": results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 1 if any("error" in result for result in results.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import re
+import time
+import math
+import hashlib
+from typing import Callable, Dict, List, Optional, Union
+
+from langchain_core.embeddings import Embeddings
+
+class FakeResponse:
+    """Mimics the parts of an AIMessage the gateway reads."""
+
+    def __init__(self, content: str, prompt: str):
+        self.content = content
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        self.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+class FakeLLM:
+    """Local stand-in for ChatOpenAI with a fixed latency and scripted outputs.
+
+    `script` maps a substring of the prompt to a response (or a callable taking the prompt).
+    The first matching entry wins; prompts that match nothing get `default`.
+    """
+
+    def __init__(self, latency: float = 0.0, script: Optional[Dict[str, Union[str, Callable[[str], str]]]] = None, default: str = "OK"):
+        self.latency = latency
+        self.script = script if script is not None else default_script()
+        self.default = default
+        self.calls = 0
+
+    def invoke(self, prompt) -> FakeResponse:
+        prompt = prompt if isinstance(prompt, str) else str(prompt)
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for marker, response in self.script.items():
+            if marker in prompt:
+                content = response(prompt) if callable(response) else response
+                return FakeResponse(content, prompt)
+        return FakeResponse(self.default, prompt)
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words embeddings; fast, and similar texts stay close."""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"[a-z0-9_]+", text.lower()):
+            digest = hashlib.md5(token.encode()).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+# --- Scripted outputs for the agents' prompts ---
+
+MODULES = ["market_data", "account", "strategy", "engine"]
+
+QUERIES = ["market data feed and CSV prices", "account balance and positions", "moving average strategy signals", "trading engine execution loop"]
+
+def summary_response(prompt: str) -> str:
+    """Headings and overview of the document, so summaries of different documents differ."""
+    document = prompt.split("Document:", 1)[-1].rsplit("Summary:", 1)[0]
+    lines = [line.strip() for line in document.splitlines() if line.strip()]
+    headings = [line for line in lines if line.startswith("#")]
+    overview = next((lines[i + 1] for i, line in enumerate(lines[:-1]) if line == "## Overview"), "")
+    return "\n".join(headings[:1] + ([f"- {overview}"] if overview else []) + ["- Key requirements extracted for the agent."])
+
+def plan_response(prompt: str) -> str:
+    return "\n".join([f"Create file src/{m}.py with {class_name(m)} class" for m in MODULES])
+
+def code_response(prompt: str, broken: bool = False) -> str:
+    module = step_module(prompt)
+    cls = class_name(module)
+    # A broken implementation passes validation but fails its test, forcing a fix call
+    result = "len(self.values) - 1" if broken else "len(self.values)"
+    return f"""FILE: src/{module}.py
+class {cls}:
+    def __init__(self):
+        self.values = []
+
+    def add(self, value):
+        self.values.append(value)
+        return {result}
+END_FILE
+
+FILE: tests/test_{module}.py
+import unittest
+from src.{module} import {cls}
+
+class Test{cls}(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual({cls}().add(1), 1)
+
+if __name__ == "__main__":
+    unittest.main()
+END_FILE
+"""
+
+def step_module(prompt: str) -> str:
+    match = re.search(r"step: [^\n]*?src/(\w+)\.py", prompt, re.IGNORECASE)
+    return match.group(1) if match else "module"
+
+def class_name(module: str) -> str:
+    return "".join(part.capitalize() for part in module.split("_"))
+
+def default_script(failing_modules: int = 0) -> Dict[str, Union[str, Callable[[str], str]]]:
+    """Responses keyed on markers from the RAG, coding agent, query expansion and /chat prompts.
+
+    The first generated implementation of each of the first `failing_modules` modules fails
+    its test, so the coding agent's fix path runs too.
+    """
+    failing = set(MODULES[:failing_modules])
+    return {
+        "failed its test": code_response,
+        "Summarize the following technical document": summary_response,
+        "short search queries": "\n".join(QUERIES),
+        "Create a implementation plan": plan_response,
+        "Write the code to accomplish the step": lambda prompt: code_response(prompt, broken=step_module(prompt) in failing),
+        "Answer the user's question": "Based on the context, the module must implement the documented interface."
+    }
@@ -0,0 +1,156 @@
+"""Compares the coding agent's single-query and multi-query retrieval modes.
+
+Ingests the mock requirement set with the fake LLM and fake embeddings, then for each variant
+measures recall and precision of the documents a `TaskContext` retrieves for a set of labelled
+tasks, retrieval latency, and end-to-end `run_task` wall time against `simulated_repo_origin`.
+
+Variants are single-query, multi-query without reranking, and multi-query with the cross-encoder
+reranker. The reranker is real and needs its model locally (or network access to fetch it); the
+reranked variant is skipped, and `reranker_loaded` is false, when it can't be loaded.
+
+Usage (from backend/):
+    python -m benchmarks.retrieval --output retrieval.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import contextlib
+import statistics
+from typing import Dict, List, Optional
+
+from config import config
+from benchmarks.run import setup_environment, bench_run_task, default_repo_origin
+
+# (name, retrieval mode, rerank)
+VARIANTS = [("single", "single", False), ("multi", "multi", False), ("multi_rerank", "multi", True)]
+
+# (task, titles of the requirements its implementation needs)
+LABELLED_TASKS = [
+    ("Implement Trading Engine Core", {
+        "Trading Engine Core Implementation", "Market Data Module Implementation",
+        "Strategy Module Implementation", "Account Module Implementation"
+    }),
+    ("Implement the Market Data Module with a CSV feed", {"Market Data Module Implementation"}),
+    ("Implement the Account Module", {"Account Module Implementation"}),
+    ("Implement the SMA Strategy on top of the market data feed", {"Strategy Module Implementation", "Market Data Module Implementation"}),
+    ("Run a simulation from main.py with the CSV feed and SMA strategy", {
+        "Trading Engine Core Implementation", "Market Data Module Implementation", "Strategy Module Implementation"
+    }),
+]
+
+def bench_retrieval(mode: str, k: int, fake_llm) -> Dict:
+    from agents.task_context import TaskContext
+
+    per_task = {}
+    samples = []
+    calls_before = fake_llm.calls
+    for task, relevant in LABELLED_TASKS:
+        start = time.perf_counter()
+        context = TaskContext(task, k=k, mode=mode)
+        samples.append(time.perf_counter() - start)
+        titles = [d["title"] for d in context.documents]
+        hits = len(relevant & set(titles))
+        per_task[task] = {
+            "recall": hits / len(relevant),
+            "precision": hits / len(titles) if titles else 0.0,
+            "documents": titles
+        }
+    return {
+        "recall": statistics.mean(t["recall"] for t in per_task.values()),
+        "precision": statistics.mean(t["precision"] for t in per_task.values()),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "llm_calls": fake_llm.calls - calls_before,
+        "tasks": per_task
+    }
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="bench-retrieval-")
+    try:
+        fake_llm = setup_environment(workdir, args.llm_latency)
+        from agents.analyst_agent import analyst_agent
+        from services.reranker import reranker
+        logging.getLogger().setLevel(logging.WARNING)
+
+        reranker.model_name = args.reranker
+        reranker._model = None
+        analyst_agent.import_requirements("")
+        load_start = time.perf_counter()
+        reranker_loaded = bool(reranker.load())
+        reranker_load_seconds = time.perf_counter() - load_start
+
+        model = reranker._model
+        results = {}
+        for name, mode, rerank in VARIANTS:
+            if rerank and not reranker_loaded:
+                continue
+            config.RETRIEVAL_MODE = mode
+            reranker._model = model if rerank else False
+            results[name] = {"retrieval": bench_retrieval(mode, args.k, fake_llm)}
+            if "run_task" not in args.skip:
+                variant_dir = os.path.join(workdir, name)
+                os.makedirs(variant_dir)
+                results[name]["run_task"] = bench_run_task(args.repo, variant_dir, fake_llm)
+        reranker._model = model
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Each variant against single-query retrieval
+    change = {}
+    for name in results:
+        if name == "single":
+            continue
+        change[name] = {
+            "recall": results[name]["retrieval"]["recall"] - results["single"]["retrieval"]["recall"],
+            "precision": results[name]["retrieval"]["precision"] - results["single"]["retrieval"]["precision"],
+            "retrieval_ms": results[name]["retrieval"]["mean_ms"] - results["single"]["retrieval"]["mean_ms"]
+        }
+        if "run_task" not in args.skip:
+            change[name]["run_task_seconds"] = results[name]["run_task"]["seconds"] - results["single"]["run_task"]["seconds"]
+            change[name]["run_task_llm_calls"] = results[name]["run_task"]["llm_calls"] - results["single"]["run_task"]["llm_calls"]
+
+    return {
+        "timestamp": time.time(),
+        "parameters": {
+            "k": args.k,
+            "llm_latency": args.llm_latency,
+            "reranker": args.reranker or None,
+            "reranker_loaded": reranker_loaded,
+            "reranker_load_seconds": reranker_load_seconds,
+            "rerank_budget_ms": reranker.budget_ms,
+            "subqueries": config.RETRIEVAL_SUBQUERIES,
+            "max_documents": config.RETRIEVAL_MAX_DOCUMENTS
+        },
+        "results": results,
+        "change": change
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare single- and multi-query retrieval for the coding agent.")
+    parser.add_argument("--k", type=int, default=3, help="Documents retrieved per query.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds each fake LLM call takes.")
+    parser.add_argument("--reranker", default=config.RERANKER_MODEL, help="Cross-encoder model; empty skips the reranked variant.")
+    parser.add_argument("--repo", default=default_repo_origin(), help="Repository used for the run_task benchmark.")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["run_task"])
+    parser.add_argument("--output", help="Write results JSON here instead of stdout.")
+    args = parser.parse_args(argv)
+
+    # Agents print progress; keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    # A failed task exits early, so its run_task time isn't comparable with the other variants
+    return 0 if all(r.get("run_task", {}).get("success", True) for r in report["results"].values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
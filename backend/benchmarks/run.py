@@ -0,0 +1,226 @@
+"""Offline benchmark suite for the backend.
+
+Replaces the LLM with a fixed-latency scripted fake and the embeddings with a fast
+deterministic model, then measures ingestion throughput, /search and /chat latency under
+concurrency, and end-to-end `run_task` wall time against `simulated_repo_origin`.
+
+Usage (from backend/):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import contextlib
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import config
+from benchmarks.fakes import FakeLLM, FakeEmbeddings, default_script
+
+logger = logging.getLogger(__name__)
+
+RESULTS_VERSION = 1
+
+SEARCH_QUERIES = ["market data feed", "account balance", "moving average strategy", "trading engine", "CSV parsing"]
+TASK = "Implement Trading Engine Core"
+
+def default_repo_origin() -> str:
+    # config.SIMULATED_REPO_PATH is relative to the cwd, which is backend/ when run as a module
+    candidate = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "simulated_repo_origin")
+    return candidate if os.path.isdir(candidate) else config.SIMULATED_REPO_PATH
+
+def setup_environment(workdir: str, llm_latency: float, failing_modules: int = 0) -> FakeLLM:
+    """Points the services at the fakes. Must run before anything imports rag_service."""
+    config.WORKSPACES_DIR = workdir
+    config.LLM_MODEL = config.LLM_MODEL or "fake-llm"
+
+    from services import llm_factory
+    fake_llm = FakeLLM(latency=llm_latency, script=default_script(failing_modules))
+    llm_factory.get_embeddings = lambda: FakeEmbeddings()
+    llm_factory.llm_gateway._llm = fake_llm
+    return fake_llm
+
+def latency_stats(samples: List[float], wall: float) -> Dict:
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": percentile(0.50) * 1000,
+        "p95_ms": percentile(0.95) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "throughput_rps": len(samples) / wall if wall else 0.0
+    }
+
+def bench_ingestion(rounds: int) -> Dict:
+    from agents.analyst_agent import analyst_agent
+
+    start = time.perf_counter()
+    documents = 0
+    for _ in range(rounds):
+        documents += len(analyst_agent.import_requirements(""))
+    wall = time.perf_counter() - start
+    return {"documents": documents, "seconds": wall, "docs_per_sec": documents / wall if wall else 0.0}
+
+def bench_endpoint(client, method: str, requests: int, concurrency: int) -> Dict:
+    def call(i: int) -> float:
+        query = SEARCH_QUERIES[i % len(SEARCH_QUERIES)]
+        start = time.perf_counter()
+        if method == "search":
+            response = client.get("/search", params={"query": query})
+        else:
+            # Unique messages so the gateway can't coalesce them
+            response = client.post("/chat", json={"message": f"{query} (request {i})"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(call, range(requests)))
+    stats = latency_stats(samples, time.perf_counter() - start)
+    stats["concurrency"] = concurrency
+    return stats
+
+def prepare_repo(origin: str, workdir: str) -> str:
+    repo_path = os.path.join(workdir, "repo")
+    shutil.copytree(origin, repo_path, ignore=shutil.ignore_patterns(".git", "__pycache__"))
+    for cmd in (["git", "init", "-q"], ["git", "add", "."], ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", "commit", "-q", "-m", "Initial commit"]):
+        subprocess.run(cmd, cwd=repo_path, check=True, capture_output=True)
+    # git_service commits without identity flags
+    subprocess.run(["git", "config", "user.name", "bench"], cwd=repo_path, check=True)
+    subprocess.run(["git", "config", "user.email", "bench@localhost"], cwd=repo_path, check=True)
+    return repo_path
+
+def bench_run_task(origin: str, workdir: str, fake_llm: FakeLLM) -> Dict:
+    from agents.coding_agent import coding_agent
+    from services.tracing import tracer
+
+    repo_path = prepare_repo(origin, workdir)
+    calls_before = fake_llm.calls
+    start = time.perf_counter()
+    with tracer.trace("benchmark-run-task") as trace:
+        result = coding_agent.run_task(TASK, repo_path)
+    wall = time.perf_counter() - start
+
+    # Seconds and LLM input tokens per stage, from the task's trace
+    stages = {}
+    stage_tokens = {}
+    for span in trace["spans"]:
+        stages[span["name"]] = stages.get(span["name"], 0.0) + span["duration"]
+        if span["input_tokens"]:
+            stage_tokens[span["name"]] = stage_tokens.get(span["name"], 0) + span["input_tokens"]
+    input_tokens = sum(stage_tokens.values())
+    if not result.get("success"):
+        logger.warning(f"run_task did not succeed, its timings are not comparable: {result.get('message')}")
+    return {
+        "task": TASK,
+        "success": bool(result.get("success")),
+        "message": result.get("message"),
+        "seconds": wall,
+        "llm_calls": fake_llm.calls - calls_before,
+        "llm_input_tokens": input_tokens,
+        "stages": stages,
+        "stage_input_tokens": stage_tokens
+    }
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(current: Dict, baseline: Dict) -> Dict[str, Dict]:
+    """Relative change per metric; positive means the value grew."""
+    before = flatten(baseline.get("results", {}))
+    after = flatten(current.get("results", {}))
+    comparison = {}
+    for name in sorted(before.keys() & after.keys()):
+        change = (after[name] - before[name]) / before[name] if before[name] else None
+        comparison[name] = {"baseline": before[name], "current": after[name], "change": change}
+    return comparison
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    try:
+        fake_llm = setup_environment(workdir, args.llm_latency, args.failing_modules)
+
+        # Importing the app builds the singletons against the fakes
+        from fastapi.testclient import TestClient
+        import main
+        logging.getLogger().setLevel(logging.WARNING)
+        client = TestClient(main.app)
+
+        results = {}
+        if "ingestion" not in args.skip:
+            results["ingestion"] = bench_ingestion(args.ingest_rounds)
+        if "search" not in args.skip:
+            results["search"] = bench_endpoint(client, "search", args.requests, args.concurrency)
+        if "chat" not in args.skip:
+            results["chat"] = bench_endpoint(client, "chat", args.requests, args.concurrency)
+        if "run_task" not in args.skip:
+            results["run_task"] = bench_run_task(args.repo, workdir, fake_llm)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": time.time(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "parameters": {
+            "llm_latency": args.llm_latency,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "ingest_rounds": args.ingest_rounds,
+            "failing_modules": args.failing_modules
+        },
+        "results": results
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline backend benchmarks with a fake LLM and fake embeddings.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds each fake LLM call takes.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint benchmark.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients for endpoint benchmarks.")
+    parser.add_argument("--ingest-rounds", type=int, default=3, help="Times the mock requirement set is imported.")
+    parser.add_argument("--failing-modules", type=int, default=0, help="Modules whose first generated code fails its test in run_task.")
+    parser.add_argument("--repo", default=default_repo_origin(), help="Repository used for the run_task benchmark.")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["ingestion", "search", "chat", "run_task"])
+    parser.add_argument("--output", help="Write results JSON here instead of stdout.")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against.")
+    args = parser.parse_args(argv)
+
+    # Agents print progress; keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    # A failed task exits early, so a faster run_task may just mean a broken one
+    return 0 if report["results"].get("run_task", {}).get("success", True) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,124 @@
 #!/Users/shaneshou/Dev/gts-notebookllm/backend/bin/python
 
+import os
 import sys
 import json
 import argparse
+import multiprocessing
+from collections import deque
+from itertools import islice
 from pprint import pformat
 
 import jmespath
 from jmespath import exceptions
 
 
+ERROR_PREFIXES = (
+    (exceptions.ArityError, 'invalid-arity'),
+    (exceptions.JMESPathTypeError, 'invalid-type'),
+    (exceptions.UnknownFunctionError, 'unknown-function'),
+    (exceptions.ParseError, 'syntax-error'),
+)
+
+_compiled = None
+
+
+class RecordError(Exception):
+    """A record that failed to parse or evaluate, with its 1-based line."""
+
+    def __init__(self, prefix, line_number, message):
+        super(RecordError, self).__init__(prefix, line_number, message)
+        self.prefix = prefix
+        self.line_number = line_number
+        self.message = message
+
+    def __str__(self):
+        return "%s: line %d: %s" % (self.prefix, self.line_number,
+                                     self.message)
+
+
+def _init_worker(expression):
+    global _compiled
+    _compiled = jmespath.compile(expression)
+
+
+def _error_prefix(error):
+    for error_type, prefix in ERROR_PREFIXES:
+        if isinstance(error, error_type):
+            return prefix
+    return None
+
+
+def _search_lines(chunk, compiled=None):
+    """Evaluates the expression against each JSON line, returning output lines.
+
+    `chunk` is (line number of the first line, lines). Failures are raised
+    as RecordError naming the offending line.
+    """
+    compiled = compiled or _compiled
+    first_line, lines = chunk
+    results = []
+    for line_number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            result = compiled.search(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise RecordError('invalid-json', line_number, str(e))
+        except exceptions.JMESPathError as e:
+            prefix = _error_prefix(e)
+            if prefix is None:
+                raise
+            raise RecordError(prefix, line_number, str(e))
+        results.append(json.dumps(result, ensure_ascii=False))
+    return results
+
+
+def _chunks(stream, size):
+    line_number = 1
+    while True:
+        lines = list(islice(stream, size))
+        if not lines:
+            return
+        yield line_number, lines
+        line_number += len(lines)
+
+
+def stream_search(expression, stream, out, workers=1, chunk_size=1000,
+                  skip_null=False):
+    """Evaluates a JMESPath expression against line-delimited JSON.
+
+    The expression is compiled once, records are read one chunk at a time
+    (constant memory) and each result is written as one line, in input order.
+    With workers > 1 chunks are evaluated in parallel processes, with at
+    most 2 * workers chunks in flight. A failing record raises RecordError.
+    """
+    def write(results):
+        for result in results:
+            if skip_null and result == 'null':
+                continue
+            out.write(result)
+            out.write('\n')
+
+    if workers <= 1:
+        compiled = jmespath.compile(expression)
+        for chunk in _chunks(stream, chunk_size):
+            write(_search_lines(chunk, compiled))
+        return
+
+    # Chunks are submitted from this thread, so nothing is left blocked
+    # when an error tears the pool down
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(expression,)) as pool:
+        pending = deque()
+        for chunk in _chunks(stream, chunk_size):
+            if len(pending) >= workers * 2:
+                write(pending.popleft().get())
+            pending.append(pool.apply_async(_search_lines, (chunk,)))
+        while pending:
+            write(pending.popleft().get())
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('expression')
@@ -18,6 +128,17 @@ def main():
                               'read from stdin.'))
     parser.add_argument('--ast', action='store_true',
                         help=('Pretty print the AST, do not search the data.'))
+    parser.add_argument('-l', '--jsonl', action='store_true',
+                        help=('Treat the input as line-delimited JSON: '
+                              'search each record and print one result '
+                              'per line.'))
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help=('Number of processes used to evaluate '
+                              'chunks in --jsonl mode.'))
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help=('Records per chunk in --jsonl mode.'))
+    parser.add_argument('--skip-null', action='store_true',
+                        help=('Do not print null results in --jsonl mode.'))
     args = parser.parse_args()
     expression = args.expression
     if args.ast:
@@ -26,6 +147,34 @@ def main():
         sys.stdout.write(pformat(expression.parsed))
         sys.stdout.write('\n')
         return 0
+    if args.jsonl:
+        try:
+            # Compile up front so syntax errors are reported before reading
+            jmespath.compile(expression)
+            if args.filename:
+                with open(args.filename, 'r') as f:
+                    stream_search(expression, f, sys.stdout, args.workers,
+                                  args.chunk_size, args.skip_null)
+            else:
+                stream_search(expression, sys.stdin, sys.stdout, args.workers,
+                              args.chunk_size, args.skip_null)
+        except BrokenPipeError:
+            # The reader went away (e.g. `| head`); the pool, if any, has
+            # already been terminated by its `with` block.  Point stdout at
+            # devnull so the interpreter's final flush doesn't fail again.
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return 1
+        except RecordError as e:
+            sys.stderr.write("%s\n" % e)
+            return 1
+        except exceptions.JMESPathError as e:
+            prefix = _error_prefix(e)
+            if prefix is None:
+                raise
+            sys.stderr.write("%s: %s\n" % (prefix, e))
+            return 1
+        return 0
     if args.filename:
         with open(args.filename, 'r') as f:
             data = json.load(f)
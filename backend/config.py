@@ -8,6 +8,25 @@ class Config:
     LLM_API_KEY = os.getenv("LLM_API_KEY")
     LLM_MODEL = os.getenv("LLM_MODEL")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # "huggingface" (PyTorch) or "onnx" (int8-quantized ONNX Runtime export of the same model)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+    EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+    # Coding-agent retrieval: "single" (raw task query) or "multi" (sub-queries + cross-encoder rerank)
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "single")
+    RETRIEVAL_SUBQUERIES = int(os.getenv("RETRIEVAL_SUBQUERIES", "4"))
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
+    RETRIEVAL_MAX_DOCUMENTS = int(os.getenv("RETRIEVAL_MAX_DOCUMENTS", "5"))
+    RERANK_BUDGET_MS = int(os.getenv("RERANK_BUDGET_MS", "200"))
+
+    # Shared LLM gateway limits (0 disables a tokens-per-minute budget)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_WORKSPACE_CONCURRENCY = int(os.getenv("LLM_WORKSPACE_CONCURRENCY", "2"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    LLM_WORKSPACE_TOKENS_PER_MINUTE = int(os.getenv("LLM_WORKSPACE_TOKENS_PER_MINUTE", "0"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
     
     JIRA_URL = os.getenv("JIRA_URL")
     JIRA_USERNAME = os.getenv("JIRA_USERNAME")
@@ -17,6 +36,15 @@ class Config:
     CONFLUENCE_USERNAME = os.getenv("CONFLUENCE_USERNAME")
     CONFLUENCE_TOKEN = os.getenv("CONFLUENCE_TOKEN")
     
+    # Optional snapshot loaded into an empty knowledge base at startup
+    KNOWLEDGE_SNAPSHOT = os.getenv("KNOWLEDGE_SNAPSHOT")
+
+    # Workspace lifecycle: quotas, idle time before a workspace may be evicted, cleanup cadence
+    WORKSPACE_USER_QUOTA_MB = int(os.getenv("WORKSPACE_USER_QUOTA_MB", "500"))
+    WORKSPACE_GLOBAL_QUOTA_MB = int(os.getenv("WORKSPACE_GLOBAL_QUOTA_MB", "5000"))
+    WORKSPACE_IDLE_SECONDS = int(os.getenv("WORKSPACE_IDLE_SECONDS", "3600"))
+    WORKSPACE_CLEANUP_INTERVAL_SECONDS = int(os.getenv("WORKSPACE_CLEANUP_INTERVAL_SECONDS", "300"))
+
     SIMULATED_REPO_PATH = os.path.abspath("simulated_repo_origin")
     WORKSPACES_DIR = os.path.abspath("workspaces")
 
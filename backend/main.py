@@ -1,14 +1,18 @@
-import os
 import logging
+import threading
 from typing import List, Optional
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import uuid
 
 from config import config
 from services.git_service import git_service
 from services.rag_service import rag_service
+from services.tracing import tracer
+from services.workspace_manager import workspace_manager
+from services.reranker import reranker
 from agents.analyst_agent import analyst_agent
 from agents.coding_agent import coding_agent
 
@@ -31,6 +35,7 @@ app.add_middleware(
 class CreateWorkspaceRequest(BaseModel):
     repo_url: str = config.SIMULATED_REPO_PATH # Default to local simulation
     name: str
+    owner: str = "default" # Disk quotas are enforced per owner
 
 class WorkspaceResponse(BaseModel):
     id: str
@@ -57,32 +62,41 @@ class AgentTaskResponse(BaseModel):
     pr_url: Optional[str] = None
     logs: Optional[List[str]] = None
 
-# --- State (In-Memory for MVP) ---
-workspaces = {}
+# --- State ---
+# Workspaces are persisted and evicted/rehydrated by the lifecycle manager
+workspaces = workspace_manager.workspaces
 tasks = {}
 
+@app.on_event("startup")
+def start_workspace_cleanup():
+    workspace_manager.start()
+
+@app.on_event("startup")
+def preload_reranker():
+    # Loaded off the request path; multi-query tasks skip reranking until it is ready
+    if config.RETRIEVAL_MODE == "multi":
+        threading.Thread(target=reranker.load, name="reranker-load", daemon=True).start()
+
 # --- Endpoints ---
 
 @app.post("/workspace", response_model=WorkspaceResponse)
 async def create_workspace(req: CreateWorkspaceRequest):
-    workspace_id = str(uuid.uuid4())
-    repo_path = os.path.join(config.WORKSPACES_DIR, workspace_id, "repo")
-    os.makedirs(repo_path, exist_ok=True)
-    
     # Clone the repo (simulated or real)
-    logger.info(f"Cloning repo from {req.repo_url} to {repo_path}")
-    success = git_service.clone_repo(req.repo_url, repo_path)
+    workspace = workspace_manager.create(req.name, req.repo_url, owner=req.owner)
     
-    if not success:
+    if workspace is None:
         raise HTTPException(status_code=500, detail="Failed to clone repository")
     
-    workspaces[workspace_id] = {
-        "id": workspace_id,
-        "name": req.name,
-        "repo_path": repo_path
-    }
-    
-    return WorkspaceResponse(id=workspace_id, name=req.name, repo_path=repo_path)
+    return WorkspaceResponse(id=workspace["id"], name=req.name, repo_path=workspace["repo_path"])
+
+@app.delete("/workspace/{workspace_id}")
+async def delete_workspace(workspace_id: str):
+    """Deletes a workspace's working copy, its eviction mirror and its registry entry."""
+    if workspace_id not in workspaces:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    if not workspace_manager.delete(workspace_id):
+        raise HTTPException(status_code=409, detail="Workspace is in use")
+    return {"status": "deleted", "id": workspace_id}
 
 @app.post("/import-data")
 async def import_data(req: ImportDataRequest):
@@ -92,7 +106,7 @@ async def import_data(req: ImportDataRequest):
     
     # Trigger Analyst Agent
     try:
-        docs = analyst_agent.import_requirements(req.query)
+        docs = analyst_agent.import_requirements(req.query, workspace_id=req.workspace_id)
         return {"status": "success", "imported_count": len(docs), "documents": docs}
     except Exception as e:
         logger.error(f"Import failed: {e}")
@@ -106,8 +120,8 @@ async def search_docs(query: str):
         formatted = []
         for doc in results:
              formatted.append({
-                 "source": doc.metadata.get("source", "Unknown"),
-                 "content": doc.page_content,
+                 "source": doc.get("source") or "Unknown",
+                 "content": doc["summary"],
                  "relevance": 1.0 # Placeholder
              })
         return formatted
@@ -121,12 +135,11 @@ async def chat_with_agent(req: ChatRequest):
         # Use Search Agent logic (which uses RAG + LLM)
         # For now, we reuse the RAG service directly or similar
         context_docs = rag_service.query_knowledge(req.message)
-        context_str = "\n\n".join([d.page_content for d in context_docs])
+        context_str = "\n\n".join([d["summary"] for d in context_docs])
 
         # Simple LLM call with context (Mocking the agent loop for speed/reliability in MVP check)
         # Ideally this calls SearchAgent
-        from services.llm_factory import get_llm
-        llm = get_llm()
+        from services.llm_factory import llm_gateway
 
         prompt = f"""Answer the user's question based on the context below.
 
@@ -135,9 +148,9 @@ async def chat_with_agent(req: ChatRequest):
 
         Question: {req.message}
         """
-        response = llm.invoke(prompt)
+        response = llm_gateway.invoke(prompt, workspace_id=req.workspace_id)
 
-        return {"response": response.content, "thread_id": req.thread_id or str(uuid.uuid4())}
+        return {"response": response, "thread_id": req.thread_id or str(uuid.uuid4())}
     except Exception as e:
         logger.error(f"Chat failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -147,21 +160,23 @@ async def execute_task_sync(req: AgentTaskRequest):
     """
     Executes task synchronously for MVP demo purposes.
     """
-    # Find a workspace or use default
-    repo_path = config.SIMULATED_REPO_PATH
-    if req.workspace_id and req.workspace_id in workspaces:
-        repo_path = workspaces[req.workspace_id]["repo_path"]
-
     task_id = str(uuid.uuid4())
     logger.info(f"Starting task {task_id}: {req.task}")
     
     try:
-        # Run coding agent synchronously
-        result = coding_agent.run_task(req.task, repo_path)
+        # Run coding agent synchronously, collecting per-stage spans under the task id
+        with tracer.trace(task_id):
+            if req.workspace_id and req.workspace_id in workspaces:
+                # Keeps the workspace from being evicted mid-task; rehydrates it if it was
+                with workspace_manager.use(req.workspace_id) as repo_path:
+                    result = coding_agent.run_task(req.task, repo_path, workspace_id=req.workspace_id)
+            else:
+                # Use default
+                result = coding_agent.run_task(req.task, config.SIMULATED_REPO_PATH)
 
         return AgentTaskResponse(
             task_id=task_id,
-            status="success",
+            status="success" if result.get("success", True) else "failed",
             message=result.get("message", "Task completed"),
             pr_url=result.get("pr_url"),
             logs=result.get("logs", [])
@@ -175,6 +190,18 @@ async def execute_task_sync(req: AgentTaskRequest):
             logs=[str(e)]
         )
 
+@app.get("/tasks/{task_id}/trace")
+async def get_task_trace(task_id: str):
+    trace = tracer.get_trace(task_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-style aggregated stage histograms and token counters."""
+    return PlainTextResponse(tracer.render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,235 @@
+import os
+import ast
+import sys
+import builtins
+import importlib.machinery
+import logging
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Names that are always available at module level without being bound explicitly
+IMPLICIT_NAMES = {"__file__", "__name__", "__doc__", "__package__", "__spec__", "__loader__", "__builtins__", "__path__", "__class__"}
+
+# Exception types whose handler makes an import optional (`try: import x / except ImportError:`)
+IMPORT_GUARDS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+# The backend's own packages (config, services, agents, ...) are importable here but not in a workspace
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class CodeValidator:
+    """Cheap in-process checks run on generated files before paying for a test subprocess."""
+
+    def validate(self, code_files: Dict[str, str], repo_path: str) -> List[Dict]:
+        """Returns a list of diagnostics (file, line, kind, message) for the generated Python files."""
+        diagnostics = []
+        trees = {}
+
+        # 1. Compile / parse every file first so import checks can see the whole batch
+        for filepath, content in code_files.items():
+            if not filepath.endswith(".py"):
+                continue
+            try:
+                tree = ast.parse(content, filename=filepath)
+                compile(tree, filepath, "exec")
+                trees[filepath] = tree
+            except SyntaxError as e:
+                diagnostics.append(self._diagnostic(filepath, e.lineno, "syntax-error", e.msg))
+
+        # 2. Import resolution and undefined names on the files that parsed
+        for filepath, tree in trees.items():
+            diagnostics.extend(self._check_imports(filepath, tree, code_files, repo_path))
+            diagnostics.extend(self._check_undefined_names(filepath, tree))
+
+        return diagnostics
+
+    def format_diagnostics(self, diagnostics: List[Dict]) -> str:
+        """Formats diagnostics as compiler-style lines for the fix prompt."""
+        return "\n".join([f"{d['file']}:{d['line']}: {d['kind']}: {d['message']}" for d in diagnostics])
+
+    def _diagnostic(self, filepath: str, line: Optional[int], kind: str, message: str) -> Dict:
+        return {"file": filepath, "line": line or 0, "kind": kind, "message": message}
+
+    def _check_imports(self, filepath: str, tree: ast.Module, code_files: Dict[str, str], repo_path: str) -> List[Dict]:
+        diagnostics = []
+        package = os.path.dirname(filepath).replace(os.sep, "/").replace("/", ".")
+        guarded = self._guarded_imports(tree)
+
+        for node in ast.walk(tree):
+            if id(node) in guarded:
+                continue
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if not self._module_exists(alias.name, code_files, repo_path):
+                        diagnostics.append(self._diagnostic(filepath, node.lineno, "unresolved-import", f"No module named '{alias.name}'"))
+            elif isinstance(node, ast.ImportFrom):
+                module = self._absolute_module(node, package)
+                if module is None:
+                    diagnostics.append(self._diagnostic(filepath, node.lineno, "unresolved-import", "Relative import beyond top-level package"))
+                    continue
+                if not module:
+                    # `from . import x` at the repo root: every name must be a module
+                    continue
+                if not self._module_exists(module, code_files, repo_path):
+                    diagnostics.append(self._diagnostic(filepath, node.lineno, "unresolved-import", f"No module named '{module}'"))
+                    continue
+
+                # Names can only be checked for modules that live in the workspace
+                exported = self._workspace_exports(module, code_files, repo_path)
+                if exported is None:
+                    continue
+                for alias in node.names:
+                    if alias.name == "*" or alias.name in exported:
+                        continue
+                    if self._module_exists(f"{module}.{alias.name}", code_files, repo_path):
+                        continue
+                    diagnostics.append(self._diagnostic(filepath, node.lineno, "unresolved-import", f"Cannot import name '{alias.name}' from '{module}'"))
+
+        return diagnostics
+
+    def _guarded_imports(self, tree: ast.Module) -> Set[int]:
+        """Ids of import nodes that may legitimately fail: optional imports and type-checking-only ones."""
+        guarded = set()
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Try, ast.TryStar)) and any(self._catches_import_error(h) for h in node.handlers):
+                body = node.body
+            elif isinstance(node, ast.If) and self._is_type_checking(node.test):
+                body = node.body
+            else:
+                continue
+            for statement in body:
+                guarded.update(id(n) for n in ast.walk(statement) if isinstance(n, (ast.Import, ast.ImportFrom)))
+        return guarded
+
+    def _catches_import_error(self, handler: ast.ExceptHandler) -> bool:
+        if handler.type is None:
+            return True
+        types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+        return any(self._dotted_tail(t) in IMPORT_GUARDS for t in types)
+
+    def _is_type_checking(self, test: ast.expr) -> bool:
+        return self._dotted_tail(test) == "TYPE_CHECKING"
+
+    def _dotted_tail(self, node: ast.expr) -> Optional[str]:
+        """`Name` -> its id, `a.b.Name` -> "Name"; None for anything else."""
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            return node.attr
+        return None
+
+    def _absolute_module(self, node: ast.ImportFrom, package: str) -> Optional[str]:
+        """Resolves a (possibly relative) `from` import to an absolute dotted name."""
+        if not node.level:
+            return node.module
+        parts = package.split(".") if package else []
+        if node.level - 1 > len(parts):
+            return None
+        base = parts[:len(parts) - (node.level - 1)]
+        if node.module:
+            base.append(node.module)
+        return ".".join(base)
+
+    def _workspace_path(self, module: str, code_files: Dict[str, str], repo_path: str) -> Optional[str]:
+        """Returns the relative path of a workspace module (generated or on disk), or None."""
+        rel = module.replace(".", "/")
+        for candidate in (f"{rel}.py", f"{rel}/__init__.py"):
+            if candidate in code_files or os.path.isfile(os.path.join(repo_path, candidate)):
+                return candidate
+        # Namespace package directory
+        if os.path.isdir(os.path.join(repo_path, rel)) or any(f.startswith(rel + "/") for f in code_files):
+            return rel
+        return None
+
+    def _module_exists(self, module: str, code_files: Dict[str, str], repo_path: str) -> bool:
+        top = module.split(".")[0]
+        # Workspace packages shadow installed ones, so resolve the full path there
+        if self._workspace_path(top, code_files, repo_path):
+            return self._workspace_path(module, code_files, repo_path) is not None
+        if top in sys.stdlib_module_names or top in sys.builtin_module_names:
+            return True
+        try:
+            return importlib.machinery.PathFinder.find_spec(top, self._installed_paths()) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def _installed_paths(self) -> List[str]:
+        """sys.path without the backend's directory or working directory (stdlib and site-packages)."""
+        excluded = {os.path.realpath(BACKEND_DIR), os.path.realpath(os.getcwd())}
+        return [p for p in sys.path if p and os.path.realpath(p) not in excluded]
+
+    def _workspace_exports(self, module: str, code_files: Dict[str, str], repo_path: str) -> Optional[Set[str]]:
+        """Returns the top-level names bound in a workspace module, or None if they can't be known."""
+        path = self._workspace_path(module, code_files, repo_path)
+        if not path or not path.endswith(".py"):
+            return None
+        if path in code_files:
+            source = code_files[path]
+        else:
+            try:
+                with open(os.path.join(repo_path, path), "r") as f:
+                    source = f.read()
+            except OSError:
+                return None
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return None
+
+        names = set()
+        for node in tree.body:
+            for target in self._top_level_bindings(node):
+                if target in ("*", "__getattr__"):
+                    # Dynamic exports; give up rather than report false positives
+                    return None
+                names.add(target)
+        return names
+
+    def _top_level_bindings(self, node: ast.stmt) -> List[str]:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return [node.name]
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return [(a.asname or a.name).split(".")[0] for a in node.names]
+        # Assignments, conditional definitions, try/except imports and so on
+        return [n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)] + \
+            [n.name for n in ast.walk(node) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))] + \
+            [(a.asname or a.name).split(".")[0] for n in ast.walk(node) if isinstance(n, (ast.Import, ast.ImportFrom)) for a in n.names]
+
+    def _check_undefined_names(self, filepath: str, tree: ast.Module) -> List[Dict]:
+        """Flags names that are read but never bound anywhere in the file.
+
+        This deliberately ignores scoping: a name bound in any scope counts as defined.
+        That keeps false positives near zero while still catching typos and missing imports.
+        """
+        bound = set(dir(builtins)) | IMPLICIT_NAMES
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                bound.add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound.add(node.name)
+            elif isinstance(node, ast.arg):
+                bound.add(node.arg)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    if alias.name == "*":
+                        # Star imports make every name potentially defined
+                        return []
+                    bound.add((alias.asname or alias.name).split(".")[0])
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                bound.update(node.names)
+            elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, ast.MatchMapping) and node.rest:
+                bound.add(node.rest)
+
+        diagnostics = []
+        reported = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound and node.id not in reported:
+                reported.add(node.id)
+                diagnostics.append(self._diagnostic(filepath, node.lineno, "undefined-name", f"Undefined name '{node.id}'"))
+        return diagnostics
+
+code_validator = CodeValidator()
@@ -4,9 +4,12 @@ import shutil
 import logging
 from typing import Optional
 
+from services.tracing import tracer
+
 logger = logging.getLogger(__name__)
 
 class GitService:
+    @tracer.traced("git.clone_repo")
     def clone_repo(self, repo_url: str, target_dir: str) -> bool:
         """Clones a repository to the target directory."""
         try:
@@ -19,6 +22,7 @@ class GitService:
             logger.error(f"Failed to clone repo: {e.stderr.decode()}")
             return False
 
+    @tracer.traced("git.create_branch")
     def create_branch(self, repo_dir: str, branch_name: str) -> bool:
         """Creates and switches to a new branch."""
         try:
@@ -28,6 +32,7 @@ class GitService:
             logger.error(f"Failed to create branch: {e.stderr.decode()}")
             return False
 
+    @tracer.traced("git.commit_changes")
     def commit_changes(self, repo_dir: str, message: str) -> bool:
         """Stages all changes and commits them."""
         try:
@@ -38,6 +43,7 @@ class GitService:
             logger.error(f"Failed to commit changes: {e.stderr.decode()}")
             return False
 
+    @tracer.traced("git.get_current_branch")
     def get_current_branch(self, repo_dir: str) -> Optional[str]:
         """Returns the current branch name."""
         try:
@@ -46,4 +52,41 @@ class GitService:
         except subprocess.CalledProcessError:
             return None
 
+    @tracer.traced("git.push_to_mirror")
+    def push_to_mirror(self, repo_dir: str, mirror_dir: str) -> bool:
+        """Pushes all local branches and tags to a bare mirror repository, creating it if needed."""
+        try:
+            if not os.path.exists(mirror_dir):
+                subprocess.run(["git", "init", "--bare", "-q", mirror_dir], check=True, capture_output=True)
+            subprocess.run(["git", "push", "--force", "--all", mirror_dir], cwd=repo_dir, check=True, capture_output=True)
+            subprocess.run(["git", "push", "--force", "--tags", mirror_dir], cwd=repo_dir, check=True, capture_output=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to push to mirror: {e.stderr.decode()}")
+            return False
+
+    @tracer.traced("git.restore_from_mirror")
+    def restore_from_mirror(self, mirror_dir: str, target_dir: str, branch: Optional[str], origin_url: str) -> bool:
+        """Clones a mirror back into a working copy with all its branches, then points origin at origin_url."""
+        try:
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            subprocess.run(["git", "clone", "-q", mirror_dir, target_dir], check=True, capture_output=True)
+
+            # Recreate every mirrored branch locally before origin stops pointing at the mirror
+            result = subprocess.run(["git", "for-each-ref", "--format=%(refname:short)", "refs/remotes/origin/"], cwd=target_dir, check=True, capture_output=True)
+            current = self.get_current_branch(target_dir)
+            for ref in result.stdout.decode().split():
+                name = ref[len("origin/"):]
+                if name in ("HEAD", current) or not name:
+                    continue
+                subprocess.run(["git", "branch", name, ref], cwd=target_dir, check=True, capture_output=True)
+            if branch and branch != current:
+                subprocess.run(["git", "checkout", "-q", branch], cwd=target_dir, check=True, capture_output=True)
+            subprocess.run(["git", "remote", "set-url", "origin", origin_url], cwd=target_dir, check=True, capture_output=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to restore from mirror: {e.stderr.decode()}")
+            return False
+
 git_service = GitService()
@@ -1,17 +1,198 @@
+import time
+import random
+import hashlib
+import contextlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+import httpx
+import openai
 from langchain_openai import ChatOpenAI
-from langchain_huggingface import HuggingFaceEmbeddings
 from config import config
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
 
-def get_llm():
+# Errors worth retrying: throttling, transient network failures and provider-side 5xx
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+def get_llm(http_client: Optional[httpx.Client] = None, base_url: Optional[str] = None, max_retries: int = 2):
     """Returns a ChatOpenAI instance configured with environment variables."""
     return ChatOpenAI(
         model=config.LLM_MODEL,
         api_key=config.LLM_API_KEY,
-        base_url=config.LLM_API_URL,
-        temperature=0
+        base_url=base_url or config.LLM_API_URL,
+        temperature=0,
+        http_client=http_client,
+        max_retries=max_retries
     )
 
 def get_embeddings():
-    """Returns a HuggingFaceEmbeddings instance."""
+    """Returns the embeddings backend selected by config.EMBEDDING_BACKEND."""
+    # Backends are imported lazily so the ONNX path never pays for importing PyTorch
+    if config.EMBEDDING_BACKEND == "onnx":
+        from services.onnx_embeddings import ONNXEmbeddings
+        return ONNXEmbeddings(model_name=config.EMBEDDING_MODEL, file_name=config.EMBEDDING_ONNX_FILE)
+    if config.EMBEDDING_BACKEND != "huggingface":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {config.EMBEDDING_BACKEND}")
+
     # Using sentence-transformers for local embeddings to avoid extra costs/complexity
+    from langchain_huggingface import HuggingFaceEmbeddings
     return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+
+class TokenBudget:
+    """Token bucket refilled continuously up to a tokens-per-minute limit."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: int):
+        """Blocks until `tokens` can be spent. Requests larger than the budget wait for a full bucket."""
+        if self.capacity <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, tokens: int):
+        """Charges tokens after the fact (e.g. the real usage exceeded the estimate); may go negative."""
+        if self.capacity <= 0 or tokens <= 0:
+            return
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+
+class LLMGateway:
+    """Single shared entry point for LLM calls.
+
+    Owns one pooled HTTP client and enforces global and per-workspace concurrency and
+    tokens-per-minute budgets. Identical in-flight prompts are merged into one call, and
+    throttling/transient errors are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        workspace_concurrency: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        workspace_tokens_per_minute: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0
+    ):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency or config.LLM_MAX_CONCURRENCY
+        self.workspace_concurrency = workspace_concurrency or config.LLM_WORKSPACE_CONCURRENCY
+        self.workspace_tokens_per_minute = config.LLM_WORKSPACE_TOKENS_PER_MINUTE if workspace_tokens_per_minute is None else workspace_tokens_per_minute
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self.budget = TokenBudget(config.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute)
+        self.workspace_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self.workspace_budgets: Dict[str, TokenBudget] = {}
+        self.unlimited_budget = TokenBudget(0)
+        self.in_flight: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            timeout=config.LLM_TIMEOUT
+        )
+        self._llm = None
+
+    @property
+    def llm(self) -> ChatOpenAI:
+        # Created lazily so importing the gateway doesn't require LLM settings
+        with self.lock:
+            if self._llm is None:
+                # Retries are handled here so they respect the concurrency and token limits
+                self._llm = get_llm(http_client=self.http_client, base_url=self.base_url, max_retries=0)
+            return self._llm
+
+    def invoke(self, prompt: str, workspace_id: Optional[str] = None) -> str:
+        """Sends a prompt and returns the response text. Identical concurrent prompts share one call."""
+        key = hashlib.sha256(f"{config.LLM_MODEL}\0{prompt}".encode()).hexdigest()
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not leader:
+            logger.debug("Coalesced identical in-flight LLM request")
+            return future.result()
+
+        try:
+            future.set_result(self._call(prompt, workspace_id))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+        return future.result()
+
+    def close(self):
+        self.http_client.close()
+
+    def _workspace_limits(self, workspace_id: Optional[str]):
+        # Calls outside any workspace (e.g. the frontend's /chat) are bounded by the global limits only
+        if workspace_id is None:
+            return contextlib.nullcontext(), self.unlimited_budget
+        with self.lock:
+            if workspace_id not in self.workspace_semaphores:
+                self.workspace_semaphores[workspace_id] = threading.BoundedSemaphore(self.workspace_concurrency)
+                self.workspace_budgets[workspace_id] = TokenBudget(self.workspace_tokens_per_minute)
+            return self.workspace_semaphores[workspace_id], self.workspace_budgets[workspace_id]
+
+    def _call(self, prompt: str, workspace_id: Optional[str]) -> str:
+        workspace_semaphore, workspace_budget = self._workspace_limits(workspace_id)
+
+        # Rough estimate (~4 characters per token); corrected with real usage afterwards
+        estimate = len(prompt) // 4 + 1
+
+        for attempt in range(self.max_retries + 1):
+            # Budgets are waited for before taking a concurrency slot, and slots are released during
+            # backoff, so a throttled workspace never holds slots other workspaces could use
+            workspace_budget.acquire(estimate)
+            self.budget.acquire(estimate)
+            try:
+                with workspace_semaphore, self.semaphore:
+                    response = self.llm.invoke(prompt)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                logger.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage_metadata", None) or {}
+            tracer.record_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+            extra = usage.get("total_tokens", 0) - estimate
+            workspace_budget.consume(extra)
+            self.budget.consume(extra)
+            return response.content
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,91 @@
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Dynamic int8 export published alongside the sentence-transformers checkpoints; AVX2 runs on any x86-64 host
+DEFAULT_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+class ONNXEmbeddings(Embeddings):
+    """Sentence embeddings from a quantized ONNX export, run with ONNX Runtime on CPU.
+
+    Mirrors the sentence-transformers pipeline of MiniLM-style models (mean pooling over the
+    attention mask, then L2 normalization) without importing PyTorch, so vectors stay in the
+    same space as `HuggingFaceEmbeddings` for the same model.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        file_name: str = DEFAULT_ONNX_FILE,
+        batch_size: int = 32,
+        max_length: int = 256,
+        num_threads: Optional[int] = None,
+        session=None,
+        tokenizer=None
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.tokenizer = tokenizer or self._load_tokenizer(model_name)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.session = session or self._load_session(model_name, file_name, num_threads)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _resolve(self, model_name: str, filename: str) -> str:
+        """Returns a local path for a file of the model, downloading from the Hub if needed."""
+        if os.path.isdir(model_name):
+            return os.path.join(model_name, filename)
+        from huggingface_hub import hf_hub_download
+        return hf_hub_download(repo_id=model_name, filename=filename)
+
+    def _load_tokenizer(self, model_name: str):
+        from tokenizers import Tokenizer
+        return Tokenizer.from_file(self._resolve(model_name, "tokenizer.json"))
+
+    def _load_session(self, model_name: str, file_name: str, num_threads: Optional[int]):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        path = self._resolve(model_name, file_name)
+        logger.info(f"Loading ONNX embedding model from {path}")
+        return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, inputs)[0]
+        return mean_pool(token_embeddings, attention_mask)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batch texts of similar length together to minimise padding, then restore the input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for index, vector in zip(batch, self._embed_batch([texts[i] for i in batch])):
+                vectors[index] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Masked mean over tokens followed by L2 normalization."""
+    mask = attention_mask[..., None].astype(token_embeddings.dtype)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
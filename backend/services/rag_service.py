@@ -7,24 +7,57 @@ import chromadb
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 
 from config import config
-from services.llm_factory import get_llm, get_embeddings
+from services.llm_factory import llm_gateway, get_embeddings
+from services.tracing import tracer
+from services.snapshot_service import snapshot_service, COLLECTION_NAME
 
 logger = logging.getLogger(__name__)
 
 class RAGService:
     def __init__(self):
-        self.llm = get_llm()
         self.embeddings = get_embeddings()
-        self.vector_store = Chroma(
-            collection_name="workspace_knowledge",
+        self.vector_store = self._open_store()
+        self._ensure_embedding_space()
+
+        # Bootstrap a fresh node from a snapshot instead of re-ingesting everything
+        if config.KNOWLEDGE_SNAPSHOT and self.vector_store._collection.count() == 0:
+            snapshot_service.import_snapshot(self.vector_store._collection, config.KNOWLEDGE_SNAPSHOT)
+
+    def _open_store(self) -> Chroma:
+        return Chroma(
+            collection_name=COLLECTION_NAME,
             embedding_function=self.embeddings,
-            persist_directory=f"{config.WORKSPACES_DIR}/chroma_db"
+            persist_directory=f"{config.WORKSPACES_DIR}/chroma_db",
+            collection_metadata={"embedding_model": config.EMBEDDING_MODEL}
         )
 
-    def generate_llmtxt(self, content: str) -> str:
+    def _ensure_embedding_space(self):
+        """Re-embeds the collection if it was indexed with a different embedding model.
+
+        The HuggingFace and ONNX backends produce vectors in the same space for the same model,
+        so switching backend alone keeps the index; only a model change forces a re-index.
+        """
+        collection = self.vector_store._collection
+        metadata = collection.metadata or {}
+        stored = metadata.get("embedding_model")
+        if stored == config.EMBEDDING_MODEL:
+            return
+        if stored is None:
+            # Collections created before the model was recorded; assume they match
+            collection.modify(metadata={**metadata, "embedding_model": config.EMBEDDING_MODEL})
+            return
+
+        logger.info(f"Embedding model changed from {stored} to {config.EMBEDDING_MODEL}; re-indexing knowledge base")
+        existing = collection.get(include=["documents", "metadatas"])
+        self.vector_store.delete_collection()
+        self.vector_store = self._open_store()
+        if existing["ids"]:
+            self.vector_store.add_texts(existing["documents"], metadatas=existing["metadatas"], ids=existing["ids"])
+
+    @tracer.traced("rag.generate_llmtxt")
+    def generate_llmtxt(self, content: str, workspace_id: Optional[str] = None) -> str:
         """Summarizes raw content into a high-level Markdown summary (llmtxt)."""
         prompt = PromptTemplate.from_template(
             """
@@ -38,12 +71,11 @@ class RAGService:
             Summary:
             """
         )
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"content": content})
+        return llm_gateway.invoke(prompt.format(content=content), workspace_id=workspace_id)
 
-    def ingest_document(self, content: str, title: str, source: str) -> str:
+    def ingest_document(self, content: str, title: str, source: str, workspace_id: Optional[str] = None) -> str:
         """Ingests a document into the vector store."""
-        summary = self.generate_llmtxt(content)
+        summary = self.generate_llmtxt(content, workspace_id=workspace_id)
         
         doc_id = str(uuid.uuid4())
         
@@ -60,9 +92,10 @@ class RAGService:
             }
         )
         
-        self.vector_store.add_documents([doc])
+        self.vector_store.add_documents([doc], ids=[doc_id])
         return doc_id
 
+    @tracer.traced("rag.query_knowledge")
     def query_knowledge(self, query: str, k: int = 3) -> List[Dict]:
         """Retrieves relevant documents based on the query."""
         results = self.vector_store.similarity_search(query, k=k)
@@ -78,4 +111,40 @@ class RAGService:
             })
         return documents
 
+    def embed_query(self, query: str) -> List[float]:
+        return self.embeddings.embed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embeds several queries in one batch."""
+        return self.embeddings.embed_documents(queries)
+
+    def query_by_vector(self, embedding: List[float], k: int = 3) -> List[Dict]:
+        """Like query_knowledge for a precomputed query embedding; also returns document embeddings."""
+        return self.query_by_vectors([embedding], k=k)[0]
+
+    @tracer.traced("rag.query_by_vectors")
+    def query_by_vectors(self, embeddings: List[List[float]], k: int = 3) -> List[List[Dict]]:
+        """Runs one batched similarity search for several query embeddings; one result list per query."""
+        results = self.vector_store._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            include=["documents", "metadatas", "embeddings", "distances"]
+        )
+
+        batches = []
+        for i in range(len(embeddings)):
+            documents = []
+            for summary, metadata, vector, distance in zip(results["documents"][i], results["metadatas"][i], results["embeddings"][i], results["distances"][i]):
+                documents.append({
+                    "id": metadata.get("id"),
+                    "title": metadata.get("title"),
+                    "source": metadata.get("source"),
+                    "summary": summary,
+                    "full_content": metadata.get("full_content"),
+                    "embedding": list(vector),
+                    "distance": distance
+                })
+            batches.append(documents)
+        return batches
+
 rag_service = RAGService()
@@ -0,0 +1,69 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from config import config
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class Reranker:
+    """Reorders retrieval candidates with a small local cross-encoder, within a latency budget.
+
+    The model is loaded ahead of time with `load()` (at startup); until it is ready, or if it
+    can't be loaded, candidates are returned unchanged. Batches are sized from the measured
+    cost per pair so scoring stops before the budget runs out; candidates that don't fit keep
+    their incoming order after the scored ones.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, budget_ms: Optional[int] = None, batch_size: int = 8):
+        self.model_name = config.RERANKER_MODEL if model_name is None else model_name
+        self.budget_ms = config.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+        self.batch_size = batch_size
+        self.pair_seconds = None  # Running estimate of the cost of scoring one pair
+        self._model = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Loads the cross-encoder (idempotent); returns it, or False if unavailable."""
+        with self.lock:
+            if self._model is None:
+                self._model = False
+                if self.model_name:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                        start = time.perf_counter()
+                        self._model = CrossEncoder(self.model_name)
+                        logger.info(f"Loaded reranker {self.model_name} in {time.perf_counter() - start:.1f}s")
+                    except Exception as e:
+                        logger.warning(f"Reranker unavailable, keeping retrieval order: {e}")
+            return self._model
+
+    @tracer.traced("rag.rerank")
+    def rerank(self, query: str, documents: List[Dict], text_key: str = "summary") -> List[Dict]:
+        model = self._model
+        if not model or len(documents) < 2:
+            return documents
+
+        budget = self.budget_ms / 1000
+        start = time.perf_counter()
+        scored = []
+        while len(scored) < len(documents):
+            remaining = budget - (time.perf_counter() - start)
+            # Until the per-pair cost is known, probe with a single pair
+            size = 1 if self.pair_seconds is None else min(self.batch_size, int(remaining / self.pair_seconds))
+            if remaining <= 0 or size < 1:
+                logger.info(f"Rerank budget spent after {len(scored)} of {len(documents)} candidates")
+                break
+            batch = documents[len(scored):len(scored) + size]
+            batch_start = time.perf_counter()
+            scores = model.predict([(query, d[text_key] or "") for d in batch])
+            cost = (time.perf_counter() - batch_start) / len(batch)
+            self.pair_seconds = cost if self.pair_seconds is None else 0.8 * self.pair_seconds + 0.2 * cost
+            scored.extend(zip(batch, [float(s) for s in scores]))
+
+        ranked = [d for d, _ in sorted(scored, key=lambda pair: pair[1], reverse=True)]
+        return ranked + documents[len(scored):]
+
+reranker = Reranker()
@@ -0,0 +1,203 @@
+"""Knowledge base snapshots: export a Chroma collection to one compressed, versioned file
+and load it back with bulk inserts, without re-running summarization or embeddings.
+
+Format: gzip-compressed JSON Lines. The first line is a header; every following line is one
+record, sorted by id, with the stored summary, metadata (including the raw content) and the
+float32 embedding (base64). Records carry a content hash, so two snapshots can be diffed into
+a delta that upserts changed records and deletes removed ones. A delta records the checksum of
+the snapshot it was diffed against and is only applied to a collection with that content.
+
+Usage (from backend/):
+    python -m services.snapshot_service export kb.snap.gz
+    python -m services.snapshot_service import kb.snap.gz [--replace] [--force]
+    python -m services.snapshot_service diff old.snap.gz new.snap.gz delta.snap.gz
+"""
+import sys
+import gzip
+import json
+import base64
+import hashlib
+import logging
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "gts-knowledge-snapshot"
+SNAPSHOT_VERSION = 1
+COLLECTION_NAME = "workspace_knowledge"
+BATCH_SIZE = 500
+
+class SnapshotService:
+    """Exports, imports and diffs knowledge base snapshots."""
+
+    def export_snapshot(self, collection, path: str) -> int:
+        """Writes every record of the collection to `path`; returns the record count."""
+        records = sorted(self._read_collection(collection), key=lambda r: r["id"])
+        header = self._header("full", collection, records)
+        self._write(path, header, records)
+        logger.info(f"Exported {len(records)} records to {path}")
+        return len(records)
+
+    def import_snapshot(self, collection, path: str, replace: bool = False, force: bool = False) -> Dict[str, int]:
+        """Applies a full or delta snapshot using bulk upserts; embeddings are not recomputed.
+
+        With `replace`, records missing from a full snapshot are deleted from the collection.
+        A delta is rejected unless the collection matches the snapshot it was diffed against,
+        or `force` is given.
+        """
+        header, records = self._read(path)
+        model = (collection.metadata or {}).get("embedding_model", config.EMBEDDING_MODEL)
+        if header["embedding_model"] != model:
+            raise ValueError(
+                f"Snapshot was embedded with {header['embedding_model']} but the collection uses {model}; "
+                "re-ingest instead of importing"
+            )
+        if header["kind"] == "delta" and not force:
+            current = self._checksum(sorted(self._read_collection(collection), key=lambda r: r["id"]))
+            if current != header["base"]:
+                raise ValueError(
+                    f"Delta {path} was diffed against snapshot {header['base'][:12]} but the collection is at "
+                    f"{current[:12]}; apply the missing snapshots first or use --force"
+                )
+
+        upserted = 0
+        deleted_ids = []
+        batch = []
+        for record in records:
+            if record.get("deleted"):
+                deleted_ids.append(record["id"])
+                continue
+            batch.append(record)
+            if len(batch) >= BATCH_SIZE:
+                upserted += self._upsert(collection, batch)
+                batch = []
+        if batch:
+            upserted += self._upsert(collection, batch)
+
+        if replace and header["kind"] == "full":
+            wanted = set(header["ids"])
+            deleted_ids.extend(i for i in collection.get(include=[])["ids"] if i not in wanted)
+        for start in range(0, len(deleted_ids), BATCH_SIZE):
+            collection.delete(ids=deleted_ids[start:start + BATCH_SIZE])
+
+        logger.info(f"Imported snapshot {path}: {upserted} upserted, {len(deleted_ids)} deleted")
+        return {"upserted": upserted, "deleted": len(deleted_ids)}
+
+    def diff_snapshots(self, old_path: str, new_path: str, out_path: str) -> Dict[str, int]:
+        """Writes a delta snapshot that turns the old snapshot's contents into the new one's."""
+        old_header, old_records = self._read(old_path)
+        old_hashes = {r["id"]: r["hash"] for r in old_records}
+        new_header, new_records = self._read(new_path)
+        if old_header["embedding_model"] != new_header["embedding_model"]:
+            raise ValueError("Cannot diff snapshots embedded with different models")
+
+        changed = []
+        seen = set()
+        for record in new_records:
+            seen.add(record["id"])
+            if old_hashes.get(record["id"]) != record["hash"]:
+                changed.append(record)
+        removed = [{"id": i, "deleted": True} for i in sorted(old_hashes.keys() - seen)]
+
+        header = dict(new_header, kind="delta", base=old_header["checksum"], ids=None)
+        self._write(out_path, header, sorted(changed + removed, key=lambda r: r["id"]))
+        return {"changed": len(changed), "deleted": len(removed)}
+
+    def _read_collection(self, collection) -> Iterator[Dict]:
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas", "embeddings"], limit=BATCH_SIZE, offset=offset)
+            if not page["ids"]:
+                return
+            for i, record_id in enumerate(page["ids"]):
+                yield self._record(record_id, page["documents"][i], page["metadatas"][i], page["embeddings"][i])
+            offset += len(page["ids"])
+
+    def _record(self, record_id: str, document: str, metadata: Dict, embedding) -> Dict:
+        encoded = base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode()
+        record = {"id": record_id, "document": document, "metadata": metadata or {}, "embedding": encoded}
+        record["hash"] = hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+        return record
+
+    def _header(self, kind: str, collection, records: List[Dict]) -> Dict:
+        dimensions = len(base64.b64decode(records[0]["embedding"])) // 4 if records else None
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "kind": kind,
+            "collection": collection.name,
+            "embedding_model": (collection.metadata or {}).get("embedding_model", config.EMBEDDING_MODEL),
+            "dimensions": dimensions,
+            "count": len(records),
+            "checksum": self._checksum(records),
+            "ids": [r["id"] for r in records]
+        }
+
+    def _checksum(self, records: List[Dict]) -> str:
+        """Content checksum of records sorted by id; equal for a snapshot and the collection it was loaded into."""
+        return hashlib.sha256("".join(r["hash"] for r in records).encode()).hexdigest()
+
+    def _write(self, path: str, header: Dict, records: List[Dict]):
+        # No filename or mtime in the gzip header, so identical contents give identical bytes
+        with open(path, "wb") as raw, gzip.GzipFile(filename="", fileobj=raw, mode="wb", mtime=0) as f:
+            f.write((json.dumps(header, sort_keys=True) + "\n").encode())
+            for record in records:
+                f.write((json.dumps(record, sort_keys=True) + "\n").encode())
+
+    def _read(self, path: str) -> Tuple[Dict, List[Dict]]:
+        with gzip.open(path, "rt") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"{path} is not a knowledge snapshot")
+            if header.get("version", 0) > SNAPSHOT_VERSION:
+                raise ValueError(f"Snapshot version {header['version']} is newer than supported ({SNAPSHOT_VERSION})")
+            records = [json.loads(line) for line in f if line.strip()]
+        return header, records
+
+    def _upsert(self, collection, batch: List[Dict]) -> int:
+        collection.upsert(
+            ids=[r["id"] for r in batch],
+            documents=[r["document"] for r in batch],
+            metadatas=[r["metadata"] or None for r in batch],
+            embeddings=[np.frombuffer(base64.b64decode(r["embedding"]), dtype="<f4") for r in batch]
+        )
+        return len(batch)
+
+def open_collection():
+    """Opens the knowledge collection directly, without loading an embedding model."""
+    import chromadb
+    client = chromadb.PersistentClient(path=f"{config.WORKSPACES_DIR}/chroma_db")
+    return client.get_or_create_collection(COLLECTION_NAME, metadata={"embedding_model": config.EMBEDDING_MODEL}, embedding_function=None)
+
+snapshot_service = SnapshotService()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export, import and diff knowledge base snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export")
+    export_cmd.add_argument("path")
+    import_cmd = commands.add_parser("import")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--replace", action="store_true", help="Delete records not present in a full snapshot.")
+    import_cmd.add_argument("--force", action="store_true", help="Apply a delta even if the collection doesn't match its base snapshot.")
+    diff_cmd = commands.add_parser("diff")
+    diff_cmd.add_argument("old")
+    diff_cmd.add_argument("new")
+    diff_cmd.add_argument("out")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(json.dumps({"exported": snapshot_service.export_snapshot(open_collection(), args.path)}))
+    elif args.command == "import":
+        print(json.dumps(snapshot_service.import_snapshot(open_collection(), args.path, replace=args.replace, force=args.force)))
+    else:
+        print(json.dumps(snapshot_service.diff_snapshots(args.old, args.new, args.out)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import os
+import ast
+import logging
+from typing import Dict, List, Set, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directories that never contain workspace code
+IGNORED_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules", ".pytest_cache"}
+
+class TestSelector:
+    """Selects the test modules affected by a change using the workspace's import graph."""
+    __test__ = False  # Not a test class, despite the name
+
+    def find_python_files(self, repo_path: str) -> List[str]:
+        """Returns all Python files in the repo as paths relative to its root."""
+        files = []
+        for root, dirs, filenames in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+            for filename in filenames:
+                if filename.endswith(".py"):
+                    files.append(os.path.relpath(os.path.join(root, filename), repo_path).replace(os.sep, "/"))
+        return sorted(files)
+
+    def is_test_file(self, filepath: str) -> bool:
+        filename = os.path.basename(filepath)
+        return filename.startswith("test") and filename.endswith(".py")
+
+    def find_test_files(self, repo_path: str) -> List[str]:
+        return [f for f in self.find_python_files(repo_path) if self.is_test_file(f)]
+
+    def build_dependency_map(self, repo_path: str) -> Dict[str, Set[str]]:
+        """Maps each workspace file to the workspace files it imports directly."""
+        files = self.find_python_files(repo_path)
+        modules = {self._module_name(f): f for f in files}
+
+        dependencies = {}
+        for filepath in files:
+            try:
+                with open(os.path.join(repo_path, filepath), "r") as f:
+                    tree = ast.parse(f.read(), filename=filepath)
+            except (OSError, SyntaxError, ValueError):
+                # Unparseable files can't be analysed; they still count as changed if touched
+                dependencies[filepath] = set()
+                continue
+            package = self._module_name(filepath) if filepath.endswith("__init__.py") else self._module_name(filepath).rpartition(".")[0]
+            deps = set()
+            for module in self._imported_modules(tree, package):
+                deps.update(self._resolve(module, modules))
+            deps.discard(filepath)
+            dependencies[filepath] = deps
+        return dependencies
+
+    def select_tests(self, repo_path: str, changed_files: Iterable[str]) -> List[str]:
+        """Returns the test files that transitively import any of the changed files."""
+        dependencies = self.build_dependency_map(repo_path)
+
+        # Reverse the graph: file -> files that import it
+        dependents = {}
+        for filepath, deps in dependencies.items():
+            for dep in deps:
+                dependents.setdefault(dep, set()).add(filepath)
+
+        affected = set()
+        pending = [f.replace(os.sep, "/") for f in changed_files if f.endswith(".py")]
+        while pending:
+            filepath = pending.pop()
+            if filepath in affected:
+                continue
+            affected.add(filepath)
+            pending.extend(dependents.get(filepath, ()))
+
+        return sorted(f for f in affected if self.is_test_file(f) and f in dependencies)
+
+    def shard(self, test_files: List[str], repo_path: str, shards: Optional[int] = None) -> List[List[str]]:
+        """Splits test files into balanced shards, using file size as a cost estimate."""
+        shards = max(1, min(shards or os.cpu_count() or 1, len(test_files)))
+        buckets = [[] for _ in range(shards)]
+        costs = [0] * shards
+
+        def size(filepath: str) -> int:
+            try:
+                return os.path.getsize(os.path.join(repo_path, filepath))
+            except OSError:
+                return 0
+
+        # Longest-first greedy assignment keeps shard wall times close together
+        for filepath in sorted(test_files, key=size, reverse=True):
+            index = costs.index(min(costs))
+            buckets[index].append(filepath)
+            costs[index] += size(filepath)
+        return [sorted(b) for b in buckets if b]
+
+    def _module_name(self, filepath: str) -> str:
+        name = filepath[:-3].replace("/", ".")
+        if name.endswith(".__init__"):
+            name = name[:-len(".__init__")]
+        return name
+
+    def _imported_modules(self, tree: ast.Module, package: str) -> Set[str]:
+        modules = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    parts = package.split(".") if package else []
+                    if node.level - 1 > len(parts):
+                        continue
+                    base = ".".join(parts[:len(parts) - (node.level - 1)] + ([node.module] if node.module else []))
+                else:
+                    base = node.module
+                if base:
+                    modules.add(base)
+                # `from pkg import mod` may name submodules
+                modules.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names if alias.name != "*")
+        return modules
+
+    def _resolve(self, module: str, modules: Dict[str, str]) -> Set[str]:
+        """Resolves a dotted name to workspace files, including parent package __init__ files."""
+        files = set()
+        parts = module.split(".")
+        for i in range(1, len(parts) + 1):
+            filepath = modules.get(".".join(parts[:i]))
+            if filepath:
+                files.add(filepath)
+        return files
+
+test_selector = TestSelector()
@@ -0,0 +1,139 @@
+import time
+import bisect
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds; stages range from millisecond RAG lookups to minute-long LLM calls
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Spans still open in the current thread / request, innermost last
+_active_spans: contextvars.ContextVar[Tuple[Dict, ...]] = contextvars.ContextVar("active_spans", default=())
+# The trace (if any) that finished spans are appended to
+_active_trace: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("active_trace", default=None)
+
+class Tracer:
+    """Records per-stage spans, aggregates them into histograms and keeps recent per-task traces."""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self.traces: "OrderedDict[str, Dict]" = OrderedDict()
+        # (stage, outcome) -> [bucket counts..., +Inf count], sum
+        self.histograms: Dict[Tuple[str, str], Dict] = {}
+        # (stage, direction) -> tokens
+        self.tokens: Dict[Tuple[str, str], int] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, trace_id: str):
+        """Collects every span started inside the block under `trace_id`."""
+        trace = {"trace_id": trace_id, "started_at": time.time(), "duration": None, "spans": []}
+        with self.lock:
+            self.traces[trace_id] = trace
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        token = _active_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace["duration"] = time.perf_counter() - start
+            _active_trace.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Times a stage. The outcome is "error" if the block raises; callers may set span["outcome"]."""
+        parents = _active_spans.get()
+        span = {
+            "name": name,
+            "parent": parents[-1]["name"] if parents else None,
+            "started_at": time.time(),
+            "duration": None,
+            "outcome": "ok",
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "attributes": attributes
+        }
+        token = _active_spans.set(parents + (span,))
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["outcome"] = "error"
+            span["attributes"]["error"] = str(e)
+            raise
+        finally:
+            span["duration"] = time.perf_counter() - start
+            _active_spans.reset(token)
+            self._record(span)
+
+    def traced(self, name: str):
+        """Decorator form of `span`. A return value of False marks the span as failed."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name) as span:
+                    result = func(*args, **kwargs)
+                    if result is False:
+                        span["outcome"] = "failed"
+                    return result
+            return wrapper
+        return decorator
+
+    def record_tokens(self, input_tokens: int, output_tokens: int):
+        """Attributes token usage to the innermost open span, if any."""
+        spans = _active_spans.get()
+        if spans:
+            spans[-1]["input_tokens"] += input_tokens
+            spans[-1]["output_tokens"] += output_tokens
+
+    def get_trace(self, trace_id: str) -> Optional[Dict]:
+        with self.lock:
+            return self.traces.get(trace_id)
+
+    def _record(self, span: Dict):
+        trace = _active_trace.get()
+        with self.lock:
+            if trace is not None:
+                trace["spans"].append(span)
+
+            histogram = self.histograms.setdefault((span["name"], span["outcome"]), {"buckets": [0] * (len(DURATION_BUCKETS) + 1), "sum": 0.0})
+            histogram["buckets"][bisect.bisect_left(DURATION_BUCKETS, span["duration"])] += 1
+            histogram["sum"] += span["duration"]
+
+            for direction in ("input", "output"):
+                if span[f"{direction}_tokens"]:
+                    key = (span["name"], direction)
+                    self.tokens[key] = self.tokens.get(key, 0) + span[f"{direction}_tokens"]
+
+    def render_metrics(self) -> str:
+        """Renders aggregated metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP gts_stage_duration_seconds Duration of instrumented stages.",
+            "# TYPE gts_stage_duration_seconds histogram"
+        ]
+        with self.lock:
+            for (stage, outcome), histogram in sorted(self.histograms.items()):
+                labels = f'stage="{stage}",outcome="{outcome}"'
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f'gts_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                cumulative += histogram["buckets"][-1]
+                lines.append(f'gts_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f"gts_stage_duration_seconds_sum{{{labels}}} {histogram['sum']}")
+                lines.append(f"gts_stage_duration_seconds_count{{{labels}}} {cumulative}")
+
+            lines.append("# HELP gts_stage_tokens_total LLM tokens spent per stage.")
+            lines.append("# TYPE gts_stage_tokens_total counter")
+            for (stage, direction), count in sorted(self.tokens.items()):
+                lines.append(f'gts_stage_tokens_total{{stage="{stage}",direction="{direction}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+tracer = Tracer()
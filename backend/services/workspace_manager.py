@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import config
+from services.git_service import git_service
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# States only held in memory while a git operation runs; persisted as the state they started from
+TRANSIENT_STATES = {"evicting": "active", "rehydrating": "evicted"}
+
+class WorkspaceManager:
+    """Tracks workspace size and last access, and keeps disk use under per-user and global quotas.
+
+    When a quota is exceeded, idle workspaces are evicted least-recently-used first: their
+    committed branches are pushed to a bare mirror under `mirrors/` and the working copy is
+    deleted. An evicted workspace is rehydrated from its mirror the next time it is used, and
+    the mirror is then deleted. Mirrors count against their owner's quota too. Cleanup runs
+    on a background thread, off the request path.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        user_quota_bytes: Optional[int] = None,
+        global_quota_bytes: Optional[int] = None,
+        idle_seconds: Optional[int] = None,
+        cleanup_interval: Optional[int] = None
+    ):
+        self.root = root or config.WORKSPACES_DIR
+        self.user_quota_bytes = user_quota_bytes if user_quota_bytes is not None else config.WORKSPACE_USER_QUOTA_MB * MB
+        self.global_quota_bytes = global_quota_bytes if global_quota_bytes is not None else config.WORKSPACE_GLOBAL_QUOTA_MB * MB
+        self.idle_seconds = idle_seconds if idle_seconds is not None else config.WORKSPACE_IDLE_SECONDS
+        self.cleanup_interval = cleanup_interval or config.WORKSPACE_CLEANUP_INTERVAL_SECONDS
+        self.registry_path = os.path.join(self.root, "workspaces.json")
+        self.mirrors_dir = os.path.join(self.root, "mirrors")
+
+        self.workspaces: Dict[str, Dict] = {}
+        self.in_use: Dict[str, int] = {}
+        self.condition = threading.Condition(threading.RLock())
+        self.wake = threading.Event()
+        self.thread = None
+        self._load()
+
+    # --- Registry ---
+
+    def _load(self):
+        if os.path.exists(self.registry_path):
+            with open(self.registry_path, "r") as f:
+                self.workspaces.update(json.load(f))
+        # A restart may have interrupted an eviction or rehydration; trust what is on disk
+        for workspace in self.workspaces.values():
+            if workspace.get("state") in TRANSIENT_STATES:
+                has_repo = os.path.isdir(os.path.join(workspace["repo_path"], ".git"))
+                workspace["state"] = "active" if has_repo else "evicted"
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        records = {}
+        for workspace_id, workspace in self.workspaces.items():
+            state = workspace.get("state")
+            records[workspace_id] = dict(workspace, state=TRANSIENT_STATES.get(state, state))
+        tmp_path = self.registry_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(records, f, indent=2)
+        os.replace(tmp_path, self.registry_path)
+
+    # --- Request path ---
+
+    def create(self, name: str, repo_url: str, owner: str = "default") -> Optional[Dict]:
+        """Clones a new workspace; returns its record, or None if the clone failed."""
+        workspace_id = str(uuid.uuid4())
+        repo_path = os.path.join(self.root, workspace_id, "repo")
+        os.makedirs(repo_path, exist_ok=True)
+
+        logger.info(f"Cloning repo from {repo_url} to {repo_path}")
+        if not git_service.clone_repo(repo_url, repo_path):
+            shutil.rmtree(os.path.join(self.root, workspace_id), ignore_errors=True)
+            return None
+
+        workspace = {
+            "id": workspace_id,
+            "name": name,
+            "owner": owner,
+            "repo_url": repo_url,
+            "repo_path": repo_path,
+            "state": "active",
+            "size_bytes": 0,
+            "git_bytes": 0,
+            "mirror_bytes": 0,
+            "last_access": time.time(),
+            "branch": None
+        }
+        with self.condition:
+            self.workspaces[workspace_id] = workspace
+            self._save()
+        # Measuring the clone and enforcing quotas happen in the background
+        self.wake.set()
+        return workspace
+
+    @contextmanager
+    def use(self, workspace_id: str):
+        """Marks a workspace busy (never evicted while in use) and yields its repo path, rehydrating it if needed."""
+        with self.condition:
+            while self.workspaces[workspace_id].get("state") in TRANSIENT_STATES:
+                self.condition.wait()
+            workspace = self.workspaces[workspace_id]
+            self.in_use[workspace_id] = self.in_use.get(workspace_id, 0) + 1
+            workspace["last_access"] = time.time()
+            rehydrate = workspace.get("state") == "evicted"
+            if rehydrate:
+                workspace["state"] = "rehydrating"
+        try:
+            if rehydrate:
+                self._rehydrate(workspace)
+            yield workspace["repo_path"]
+        finally:
+            with self.condition:
+                workspace["last_access"] = time.time()
+                self.in_use[workspace_id] -= 1
+                if not self.in_use[workspace_id]:
+                    del self.in_use[workspace_id]
+                self._save()
+            self.wake.set()
+
+    def _rehydrate(self, workspace: Dict):
+        """Restores a workspace marked "rehydrating"; the clone runs outside the lock."""
+        mirror_dir = self._mirror_path(workspace["id"])
+        logger.info(f"Rehydrating workspace {workspace['id']} from {mirror_dir}")
+        success = False
+        try:
+            if not git_service.restore_from_mirror(mirror_dir, workspace["repo_path"], workspace.get("branch"), workspace["repo_url"]):
+                raise RuntimeError(f"Failed to rehydrate workspace {workspace['id']}")
+            size_bytes = self._measure(workspace["repo_path"])
+            git_bytes = self._measure(os.path.join(workspace["repo_path"], ".git"))
+            # The working copy is authoritative again; the next eviction pushes a fresh mirror
+            shutil.rmtree(mirror_dir, ignore_errors=True)
+            success = True
+        finally:
+            with self.condition:
+                workspace["state"] = "active" if success else "evicted"
+                if success:
+                    workspace["size_bytes"] = size_bytes
+                    workspace["git_bytes"] = git_bytes
+                    workspace["mirror_bytes"] = 0
+                self._save()
+                self.condition.notify_all()
+
+    def delete(self, workspace_id: str) -> bool:
+        """Removes a workspace, its working copy and its mirror; returns False if it is in use."""
+        with self.condition:
+            workspace = self.workspaces.get(workspace_id)
+            if workspace is None:
+                return True
+            if workspace_id in self.in_use or workspace.get("state") in TRANSIENT_STATES:
+                return False
+            del self.workspaces[workspace_id]
+            self._save()
+        shutil.rmtree(os.path.join(self.root, workspace_id), ignore_errors=True)
+        shutil.rmtree(self._mirror_path(workspace_id), ignore_errors=True)
+        logger.info(f"Deleted workspace {workspace_id}")
+        return True
+
+    # --- Background cleanup ---
+
+    def start(self):
+        """Starts the background cleanup thread (idempotent)."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._loop, name="workspace-cleanup", daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            self.wake.wait(self.cleanup_interval)
+            self.wake.clear()
+            try:
+                self.enforce_quotas()
+            except Exception as e:
+                logger.error(f"Workspace cleanup failed: {e}")
+
+    def enforce_quotas(self) -> List[str]:
+        """Refreshes sizes and evicts idle workspaces (LRU first) until every quota is met; returns evicted ids."""
+        with self.condition:
+            workspaces = list(self.workspaces.values())
+            active = [w for w in workspaces if w.get("state", "active") == "active" and w.get("repo_path")]
+        for workspace in active:
+            workspace["size_bytes"] = self._measure(workspace["repo_path"])
+            workspace["git_bytes"] = self._measure(os.path.join(workspace["repo_path"], ".git"))
+        for workspace in workspaces:
+            workspace["mirror_bytes"] = self._measure(self._mirror_path(workspace["id"]))
+
+        evicted = []
+        for workspace in self._eviction_plan(active, workspaces):
+            if self._evict(workspace):
+                evicted.append(workspace["id"])
+        with self.condition:
+            self._save()
+        return evicted
+
+    def _eviction_plan(self, active: List[Dict], workspaces: Optional[List[Dict]] = None) -> List[Dict]:
+        now = time.time()
+        with self.condition:
+            candidates = sorted(
+                [w for w in active if w["id"] not in self.in_use and now - w.get("last_access", 0) >= self.idle_seconds],
+                key=lambda w: w.get("last_access", 0)
+            )
+
+        # Working copies of active workspaces plus every mirror, evicted workspaces included
+        usage: Dict[str, int] = {}
+        for w in active:
+            usage[w.get("owner", "default")] = usage.get(w.get("owner", "default"), 0) + w["size_bytes"]
+        for w in workspaces or active:
+            usage[w.get("owner", "default")] = usage.get(w.get("owner", "default"), 0) + w.get("mirror_bytes", 0)
+        total = sum(usage.values())
+
+        plan = []
+        # Per-user quotas first: each over-quota user's own idle workspaces, oldest first
+        for w in candidates:
+            owner = w.get("owner", "default")
+            if usage[owner] > self.user_quota_bytes:
+                plan.append(w)
+                usage[owner] -= self._eviction_saving(w)
+                total -= self._eviction_saving(w)
+        # Then the global quota across everyone's remaining idle workspaces
+        for w in candidates:
+            if total <= self.global_quota_bytes:
+                break
+            if w not in plan:
+                plan.append(w)
+                usage[w.get("owner", "default")] -= self._eviction_saving(w)
+                total -= self._eviction_saving(w)
+        if total > self.global_quota_bytes or any(used > self.user_quota_bytes for used in usage.values()):
+            logger.warning("Workspace quotas still exceeded after eviction; delete unused workspaces to free their mirrors")
+        return plan
+
+    def _eviction_saving(self, workspace: Dict) -> int:
+        """Estimated bytes freed by evicting a workspace: the git objects are kept in its mirror."""
+        return max(workspace["size_bytes"] - workspace.get("git_bytes", 0), 0)
+
+    def _evict(self, workspace: Dict) -> bool:
+        with self.condition:
+            # Re-check under the lock: a request may have picked it up since planning
+            if workspace["id"] in self.in_use or workspace.get("state", "active") != "active":
+                return False
+            workspace["state"] = "evicting"
+
+        success = False
+        try:
+            repo_path = workspace["repo_path"]
+            workspace["branch"] = git_service.get_current_branch(repo_path)
+            if git_service.push_to_mirror(repo_path, self._mirror_path(workspace["id"])):
+                shutil.rmtree(os.path.dirname(repo_path), ignore_errors=True)
+                success = True
+                logger.info(f"Evicted workspace {workspace['id']} ({workspace['size_bytes'] // MB} MB)")
+        finally:
+            with self.condition:
+                workspace["state"] = "evicted" if success else "active"
+                if success:
+                    workspace["size_bytes"] = 0
+                    workspace["git_bytes"] = 0
+                    workspace["mirror_bytes"] = self._measure(self._mirror_path(workspace["id"]))
+                self.condition.notify_all()
+        return success
+
+    def _mirror_path(self, workspace_id: str) -> str:
+        return os.path.join(self.mirrors_dir, f"{workspace_id}.git")
+
+    def _measure(self, path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for filename in files:
+                try:
+                    total += os.lstat(os.path.join(root, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+workspace_manager = WorkspaceManager()
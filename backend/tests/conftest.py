@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+
+@pytest.fixture
+def fake_backend(monkeypatch, tmp_path):
+    """Points the backend at a temporary workspaces dir and fake embeddings; returns `config`.
+
+    The RAG singleton is built against these on import, so modules that import it (agents,
+    services.rag_service) need no model download.
+    """
+    from config import config
+    from services import llm_factory
+    monkeypatch.setattr(config, "WORKSPACES_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "KNOWLEDGE_SNAPSHOT", None)
+    monkeypatch.setattr(llm_factory, "get_embeddings", lambda: FakeEmbeddings())
+    from services import rag_service
+    # The module may already be imported with the real factory bound
+    monkeypatch.setattr(rag_service, "get_embeddings", lambda: FakeEmbeddings())
+    return config
@@ -24,7 +24,7 @@ def test_create_workspace():
 def test_import_data_mock():
     # Mock analyst_agent.import_requirements
     original_import = main.analyst_agent.import_requirements
-    main.analyst_agent.import_requirements = lambda query: [{"id": "1", "title": "Test Doc", "summary": "Summary"}]
+    main.analyst_agent.import_requirements = lambda query, workspace_id=None: [{"id": "1", "title": "Test Doc", "summary": "Summary"}]
     
     # First create workspace (manually adding to dict to avoid side effects of create endpoint if needed, but endpoint calls are better if mocked)
     # But since we mock import_requirements, let's just use a fake workspace ID that we inject
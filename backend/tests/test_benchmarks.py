@@ -0,0 +1,66 @@
+import json
+
+from benchmarks import run
+from benchmarks.fakes import FakeLLM, FakeEmbeddings
+from benchmarks.run import compare, latency_stats
+
+def test_fake_embeddings_are_deterministic_and_normalized():
+    embeddings = FakeEmbeddings(dimensions=64)
+    first = embeddings.embed_query("market data feed")
+    assert first == embeddings.embed_documents(["market data feed"])[0]
+    assert abs(sum(v * v for v in first) - 1.0) < 1e-9
+
+def test_fake_embeddings_rank_overlapping_text_higher():
+    embeddings = FakeEmbeddings()
+    query = embeddings.embed_query("account balance withdraw")
+    near, far = embeddings.embed_documents(["Account balance and withdraw rules", "Moving average strategy window"])
+    dot = lambda a, b: sum(x * y for x, y in zip(a, b))
+    assert dot(query, near) > dot(query, far)
+
+def test_fake_llm_scripted_outputs():
+    llm = FakeLLM()
+    plan = llm.invoke("Create a implementation plan for the following task").content
+    assert plan.splitlines()[0] == "Create file src/market_data.py with MarketData class"
+
+    code = llm.invoke("Write the code to accomplish the step below (e.g. src/module.py).\nStep: Create file src/account.py with Account class").content
+    assert "FILE: src/account.py" in code
+    assert "FILE: tests/test_account.py" in code
+    assert code.count("END_FILE") == 2
+
+    assert llm.invoke("unmatched prompt").content == "OK"
+    assert llm.calls == 3
+
+def test_compare_reports_relative_change():
+    baseline = {"results": {"search": {"p50_ms": 10.0, "count": 5}, "run_task": {"task": "x", "seconds": 2.0}}}
+    current = {"results": {"search": {"p50_ms": 15.0, "count": 5}, "run_task": {"task": "x", "seconds": 1.0}}}
+    comparison = compare(current, baseline)
+    assert comparison["search.p50_ms"]["change"] == 0.5
+    assert comparison["run_task.seconds"]["change"] == -0.5
+    assert "run_task.task" not in comparison
+
+def test_failed_run_task_exits_non_zero(tmp_path, monkeypatch):
+    report = {"results": {"run_task": {"task": "x", "success": False, "message": "Task failed", "seconds": 0.1}}}
+    monkeypatch.setattr(run, "run", lambda args: report)
+    output = tmp_path / "bench.json"
+    assert run.main(["--output", str(output)]) == 1
+    assert json.loads(output.read_text())["results"]["run_task"]["success"] is False
+
+    report["results"]["run_task"]["success"] = True
+    assert run.main(["--output", str(output)]) == 0
+
+def test_latency_stats_percentiles():
+    stats = latency_stats([0.001 * i for i in range(1, 101)], wall=1.0)
+    assert stats["count"] == 100
+    assert round(stats["p50_ms"]) == 51
+    assert round(stats["max_ms"]) == 100
+    assert stats["throughput_rps"] == 100
+
+def test_failing_modules_break_only_the_first_generation():
+    from benchmarks.fakes import default_script
+    llm = FakeLLM(script=default_script(failing_modules=1))
+    broken = llm.invoke("Write the code to accomplish the step below.\nStep: Create file src/market_data.py").content
+    fixed = llm.invoke("The following code failed its test.\nStep: Create file src/market_data.py").content
+    healthy = llm.invoke("Write the code to accomplish the step below.\nStep: Create file src/account.py").content
+    assert "return len(self.values) - 1" in broken
+    assert "return len(self.values)\n" in fixed
+    assert "return len(self.values)\n" in healthy
@@ -0,0 +1,109 @@
+from services.code_validator import CodeValidator
+
+def test_valid_files_have_no_diagnostics(tmp_path):
+    validator = CodeValidator()
+    files = {
+        "src/account.py": "import os\n\nclass Account:\n    def deposit(self, amount):\n        return os.getcwd(), amount\n",
+        "tests/test_account.py": "import unittest\nfrom src.account import Account\n\nclass T(unittest.TestCase):\n    def test_it(self):\n        Account().deposit(1)\n",
+    }
+    assert validator.validate(files, str(tmp_path)) == []
+
+def test_syntax_error():
+    validator = CodeValidator()
+    diagnostics = validator.validate({"src/bad.py": "def broken(:\n    pass\n"}, "/nonexistent")
+    assert len(diagnostics) == 1
+    assert diagnostics[0]["kind"] == "syntax-error"
+    assert diagnostics[0]["file"] == "src/bad.py"
+
+def test_unresolved_imports(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "market_data.py").write_text("class MarketDataProvider:\n    pass\n")
+    validator = CodeValidator()
+    files = {
+        "src/engine.py": (
+            "import not_a_real_module_xyz\n"
+            "from src.market_data import MarketDataProvider, CSVFeed\n"
+            "from src.missing import Thing\n"
+        ),
+    }
+    messages = [d["message"] for d in validator.validate(files, str(tmp_path)) if d["kind"] == "unresolved-import"]
+    assert "No module named 'not_a_real_module_xyz'" in messages
+    assert "Cannot import name 'CSVFeed' from 'src.market_data'" in messages
+    assert "No module named 'src.missing'" in messages
+    assert len(messages) == 3
+
+def test_relative_import_within_batch(tmp_path):
+    validator = CodeValidator()
+    files = {
+        "src/strategy.py": "from .signal import Signal\n\nSignal\n",
+        "src/signal.py": "class Signal:\n    pass\n",
+    }
+    assert validator.validate(files, str(tmp_path)) == []
+
+def test_undefined_names(tmp_path):
+    validator = CodeValidator()
+    source = (
+        "def sma(prices, window):\n"
+        "    total = sum(prices[-window:])\n"
+        "    return totl / window\n"
+        "\n"
+        "try:\n"
+        "    pass\n"
+        "except ValueError as err:\n"
+        "    print(err, [x for x in range(3)], Decimal)\n"
+    )
+    diagnostics = validator.validate({"src/strategy.py": source}, str(tmp_path))
+    assert [d["message"] for d in diagnostics] == ["Undefined name 'totl'", "Undefined name 'Decimal'"]
+    assert diagnostics[0]["line"] == 3
+
+def test_star_import_disables_undefined_names(tmp_path):
+    validator = CodeValidator()
+    assert validator.validate({"src/a.py": "from os.path import *\njoin('a', 'b')\n"}, str(tmp_path)) == []
+
+def test_format_diagnostics():
+    validator = CodeValidator()
+    text = validator.format_diagnostics([{"file": "src/a.py", "line": 3, "kind": "undefined-name", "message": "Undefined name 'x'"}])
+    assert text == "src/a.py:3: undefined-name: Undefined name 'x'"
+
+def test_backend_modules_do_not_resolve_in_workspaces(tmp_path):
+    validator = CodeValidator()
+    files = {"src/a.py": "import config\nimport json\nimport numpy\nfrom services.rag_service import rag_service\nfrom agents import coding_agent\n"}
+    messages = [d["message"] for d in validator.validate(files, str(tmp_path)) if d["kind"] == "unresolved-import"]
+    assert messages == ["No module named 'config'", "No module named 'services.rag_service'", "No module named 'agents'"]
+
+def test_optional_imports_are_not_reported(tmp_path):
+    validator = CodeValidator()
+    source = (
+        "try:\n"
+        "    import ujson as json\n"
+        "except ImportError:\n"
+        "    import json\n"
+        "try:\n"
+        "    from fast_csv_xyz import reader\n"
+        "except (ValueError, ModuleNotFoundError):\n"
+        "    reader = None\n"
+        "try:\n"
+        "    import not_guarded_xyz\n"
+        "except ValueError:\n"
+        "    pass\n"
+        "\n"
+        "json, reader\n"
+    )
+    messages = [d["message"] for d in validator.validate({"src/a.py": source}, str(tmp_path))]
+    assert messages == ["No module named 'not_guarded_xyz'"]
+
+def test_type_checking_imports_are_not_reported(tmp_path):
+    validator = CodeValidator()
+    source = (
+        "import typing\n"
+        "from typing import TYPE_CHECKING\n"
+        "if TYPE_CHECKING:\n"
+        "    from src.engine import Engine\n"
+        "if typing.TYPE_CHECKING:\n"
+        "    import stubs_only_xyz\n"
+        "\n"
+        "class Strategy:\n"
+        "    def attach(self, engine: 'Engine'):\n"
+        "        return super().attach(engine), __class__\n"
+    )
+    assert validator.validate({"src/strategy.py": source}, str(tmp_path)) == []
@@ -0,0 +1,34 @@
+import pytest
+
+@pytest.fixture
+def agent(monkeypatch, fake_backend):
+    from agents import coding_agent as module
+
+    commits = []
+    monkeypatch.setattr(module, "TaskContext", lambda *args, **kwargs: None)
+    monkeypatch.setattr(module.git_service, "create_branch", lambda repo, branch: True)
+    monkeypatch.setattr(module.git_service, "commit_changes", lambda repo, message: commits.append(message) or True)
+    monkeypatch.setattr(module.test_selector, "find_test_files", lambda repo: ["tests/test_a.py", "tests/test_b.py"])
+    monkeypatch.setattr(module.test_selector, "shard", lambda files, repo: [[f] for f in files])
+    agent = module.CodingAgent()
+    monkeypatch.setattr(agent, "_create_plan", lambda task, context, repo: ["Create file src/a.py"])
+    monkeypatch.setattr(agent, "_execute_step", lambda step, context, repo: None)
+    return agent, commits
+
+def test_full_suite_failure_stops_before_commit(agent, monkeypatch):
+    agent, commits = agent
+    monkeypatch.setattr(agent, "_run_tests", lambda shards, repo: [(["tests/test_a.py"], True, "ok"), (["tests/test_b.py"], False, "AssertionError: boom")])
+
+    result = agent.run_task("Implement A", "/tmp/repo")
+    assert result["success"] is False
+    assert result["pr_url"] is None
+    assert commits == []
+    assert any("tests/test_b.py" in line and "boom" in line for line in result["logs"])
+
+def test_passing_suite_commits(agent, monkeypatch):
+    agent, commits = agent
+    monkeypatch.setattr(agent, "_run_tests", lambda shards, repo: [(shard, True, "ok") for shard in shards])
+
+    result = agent.run_task("Implement A", "/tmp/repo")
+    assert result["success"] is True
+    assert commits == ["Implemented task: Implement A"]
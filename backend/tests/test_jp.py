@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+import subprocess
+import importlib.util
+
+import pytest
+
+# bin/ is not a package; load the script as a module
+_spec = importlib.util.spec_from_file_location("jp", os.path.join(os.path.dirname(os.path.dirname(__file__)), "bin", "jp.py"))
+jp = importlib.util.module_from_spec(_spec)
+# Registered so pool workers can unpickle its functions
+sys.modules["jp"] = jp
+_spec.loader.exec_module(jp)
+
+RECORDS = "".join('{"id": %d, "name": %s}\n' % (i, '"n%d"' % i if i % 3 else "null") for i in range(1, 101))
+
+def search(text, expression="name", **kwargs):
+    out = io.StringIO()
+    jp.stream_search(expression, io.StringIO(text), out, **kwargs)
+    return out.getvalue().splitlines()
+
+def test_parallel_output_matches_serial_in_input_order():
+    serial = search(RECORDS, "id", chunk_size=7)
+    assert serial == [str(i) for i in range(1, 101)]
+    assert search(RECORDS, "id", workers=3, chunk_size=7) == serial
+
+def test_skip_null():
+    results = search(RECORDS, skip_null=True, workers=2, chunk_size=10)
+    assert "null" not in results
+    assert results == [r for r in search(RECORDS) if r != "null"]
+
+def test_blank_lines_are_ignored():
+    assert search('{"name": "a"}\n\n   \n{"name": "b"}\n') == ['"a"', '"b"']
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_invalid_json_reports_line(workers):
+    text = RECORDS[:RECORDS.index("\n", 200) + 1] + "\n{bad\n" + RECORDS
+    line = text[:text.index("{bad")].count("\n") + 1
+    with pytest.raises(jp.RecordError) as info:
+        search(text, workers=workers, chunk_size=3)
+    assert info.value.prefix == "invalid-json"
+    assert info.value.line_number == line
+
+def test_type_error_in_parallel_mode_does_not_hang():
+    text = '{"a": 1}\n' * 25 + '{"a": "x"}\n' + '{"a": 2}\n' * 100
+    with pytest.raises(jp.RecordError) as info:
+        search(text, "abs(a)", workers=2, chunk_size=10)
+    assert info.value.prefix == "invalid-type"
+    assert info.value.line_number == 26
+    assert str(info.value).startswith("invalid-type: line 26: ")
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_closed_stdout_exits_quietly(tmp_path, workers):
+    # Like `jp.py --jsonl ... | head -1`: the reader stops after the first line
+    data = tmp_path / "records.jsonl"
+    data.write_text(RECORDS * 500)
+    process = subprocess.Popen(
+        [sys.executable, jp.__file__, "--jsonl", "-j", workers, "--chunk-size", "100", "-f", str(data), "id"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    process.stdout.readline()
+    process.stdout.close()
+    assert process.wait(timeout=60) == 1
+    assert process.stderr.read() == b""
@@ -0,0 +1,175 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config import config
+from services.llm_factory import LLMGateway, TokenBudget
+
+class StubState:
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with state.lock:
+                state.calls += 1
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+                fail = state.failures > 0
+                if fail:
+                    state.failures -= 1
+            time.sleep(state.delay)
+            with state.lock:
+                state.active -= 1
+
+            if fail:
+                payload = {"error": {"message": "rate limited", "type": "rate_limit"}}
+                status = 429
+            else:
+                payload = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "echo: " + body["messages"][-1]["content"]}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
+                }
+                status = 200
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    return Handler
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    monkeypatch.setattr(config, "LLM_MODEL", "stub-model")
+    monkeypatch.setattr(config, "LLM_API_KEY", "stub-key")
+    servers = []
+
+    def start(**kwargs):
+        state = StubState(**kwargs)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1", state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def run_concurrently(fn, args):
+    results = [None] * len(args)
+    def target(i):
+        results[i] = fn(*args[i])
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(len(args))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_invoke_returns_content(stub_server):
+    url, state = stub_server()
+    gateway = LLMGateway(base_url=url)
+    assert gateway.invoke("hello") == "echo: hello"
+    assert state.calls == 1
+
+def test_identical_in_flight_requests_are_coalesced(stub_server):
+    url, state = stub_server(delay=0.3)
+    gateway = LLMGateway(base_url=url)
+    results = run_concurrently(gateway.invoke, [("same prompt",)] * 5)
+    assert results == ["echo: same prompt"] * 5
+    assert state.calls == 1
+
+def test_global_and_workspace_concurrency_limits(stub_server):
+    url, state = stub_server(delay=0.2)
+    gateway = LLMGateway(base_url=url, max_concurrency=3, workspace_concurrency=1)
+    run_concurrently(gateway.invoke, [(f"prompt {i}", "ws-a") for i in range(3)])
+    assert state.max_active == 1
+
+    state.max_active = 0
+    run_concurrently(gateway.invoke, [(f"other {i}", f"ws-{i}") for i in range(6)])
+    assert state.max_active <= 3
+    assert state.calls == 9
+
+def test_rate_limited_calls_are_retried(stub_server):
+    url, state = stub_server(failures=2)
+    gateway = LLMGateway(base_url=url, max_retries=3, backoff_base=0.01)
+    assert gateway.invoke("retry me") == "echo: retry me"
+    assert state.calls == 3
+
+def test_retries_are_bounded(stub_server):
+    import openai
+    url, state = stub_server(failures=10)
+    gateway = LLMGateway(base_url=url, max_retries=1, backoff_base=0.01)
+    with pytest.raises(openai.RateLimitError):
+        gateway.invoke("always fails")
+    assert state.calls == 2
+
+def test_token_budget_blocks_until_refilled():
+    budget = TokenBudget(tokens_per_minute=600)  # 10 tokens per second
+    budget.acquire(600)
+    start = time.monotonic()
+    budget.acquire(2)
+    assert time.monotonic() - start >= 0.15
+
+def test_disabled_token_budget_never_blocks():
+    budget = TokenBudget(tokens_per_minute=0)
+    budget.acquire(10 ** 9)
+    budget.consume(10 ** 9)
+
+def test_over_budget_workspace_does_not_hold_global_slots(stub_server):
+    url, state = stub_server()
+    # The stub reports 10 tokens per call: A's first call spends its whole budget, the next waits ~30s
+    gateway = LLMGateway(base_url=url, max_concurrency=1, workspace_tokens_per_minute=10)
+    gateway.invoke("first call from A", "ws-a")
+
+    blocked = threading.Thread(target=gateway.invoke, args=("second call from A", "ws-a"), daemon=True)
+    blocked.start()
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    assert gateway.invoke("call from B", "ws-b") == "echo: call from B"
+    assert time.monotonic() - start < 5
+    assert blocked.is_alive()
+
+def test_backoff_releases_the_global_slot(stub_server, monkeypatch):
+    from services import llm_factory
+    url, state = stub_server(failures=1)
+    gateway = LLMGateway(base_url=url, max_concurrency=1, max_retries=1, backoff_base=10, backoff_cap=10)
+    # Always back off for the full 10s
+    monkeypatch.setattr(llm_factory.random, "uniform", lambda a, b: b)
+
+    retrying = threading.Thread(target=gateway.invoke, args=("fails once", "ws-a"), daemon=True)
+    retrying.start()
+    while state.calls == 0:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    assert gateway.invoke("meanwhile", "ws-b") == "echo: meanwhile"
+    assert time.monotonic() - start < 5
+    assert retrying.is_alive()
+
+def test_calls_without_a_workspace_use_only_global_limits(stub_server):
+    url, state = stub_server(delay=0.2)
+    gateway = LLMGateway(base_url=url, max_concurrency=4, workspace_concurrency=1, workspace_tokens_per_minute=10)
+    run_concurrently(gateway.invoke, [(f"no workspace {i}",) for i in range(8)])
+    assert state.max_active == 4
+    assert state.calls == 8
@@ -0,0 +1,57 @@
+import numpy as np
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from services.onnx_embeddings import ONNXEmbeddings, mean_pool
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "market": 2, "data": 3, "account": 4, "balance": 5}
+
+class StubInput:
+    def __init__(self, name):
+        self.name = name
+
+class StubSession:
+    """Returns one-hot token embeddings so pooled vectors are predictable."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_inputs(self):
+        return [StubInput("input_ids"), StubInput("attention_mask"), StubInput("token_type_ids")]
+
+    def run(self, outputs, inputs):
+        self.batches.append(inputs["input_ids"].shape)
+        assert set(inputs) == {"input_ids", "attention_mask", "token_type_ids"}
+        return [np.eye(len(VOCAB), dtype=np.float32)[inputs["input_ids"]]]
+
+def make_embeddings(batch_size=32):
+    tokenizer = Tokenizer(WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    session = StubSession()
+    return ONNXEmbeddings("stub", batch_size=batch_size, session=session, tokenizer=tokenizer), session
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    tokens = np.array([[[3.0, 4.0], [100.0, 100.0]]])
+    mask = np.array([[1, 0]])
+    np.testing.assert_allclose(mean_pool(tokens, mask), [[0.6, 0.8]])
+
+def test_embeddings_match_unpadded_query():
+    embeddings, _ = make_embeddings()
+    documents = embeddings.embed_documents(["market data", "account", "account balance market"])
+    for text, vector in zip(["market data", "account", "account balance market"], documents):
+        np.testing.assert_allclose(vector, embeddings.embed_query(text), atol=1e-6)
+
+    expected = np.zeros(len(VOCAB))
+    expected[[VOCAB["market"], VOCAB["data"]]] = 1 / np.sqrt(2)
+    np.testing.assert_allclose(documents[0], expected, atol=1e-6)
+
+def test_batches_group_similar_lengths_and_keep_order():
+    embeddings, session = make_embeddings(batch_size=2)
+    texts = ["account balance market data", "data", "market data account", "account"]
+    vectors = embeddings.embed_documents(texts)
+    # Shortest texts share the first batch, so it needs no more padding than its longest member
+    assert session.batches == [(2, 1), (2, 4)]
+    assert np.argmax(vectors[1]) == VOCAB["data"]
+    assert np.argmax(vectors[3]) == VOCAB["account"]
+    assert embeddings.embed_documents([]) == []
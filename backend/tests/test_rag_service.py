@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+
+@pytest.fixture
+def rag_module(fake_backend):
+    from services import rag_service
+    return rag_service, fake_backend
+
+def test_embedding_model_change_reindexes_and_keeps_records(rag_module, monkeypatch):
+    module, config = rag_module
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "model-a")
+    store = module.RAGService()
+    metadatas = [{"id": "doc-1", "title": "Account", "full_content": "withdraw rules"}, {"id": "doc-2", "title": "Strategy", "full_content": "moving average"}]
+    store.vector_store.add_texts(["account summary", "strategy summary"], metadatas=metadatas, ids=["doc-1", "doc-2"])
+
+    # Model B produces vectors of a different size; the collection must be rebuilt, not reused
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "model-b")
+    monkeypatch.setattr(module, "get_embeddings", lambda: FakeEmbeddings(dimensions=128))
+    reopened = module.RAGService()
+
+    collection = reopened.vector_store._collection
+    assert collection.metadata["embedding_model"] == "model-b"
+    records = collection.get(include=["documents", "metadatas", "embeddings"])
+    assert sorted(records["ids"]) == ["doc-1", "doc-2"]
+    by_id = {i: (d, m, e) for i, d, m, e in zip(records["ids"], records["documents"], records["metadatas"], records["embeddings"])}
+    assert by_id["doc-1"][0] == "account summary"
+    assert by_id["doc-1"][1] == metadatas[0]
+    assert by_id["doc-2"][1] == metadatas[1]
+    assert len(by_id["doc-1"][2]) == 128
+    assert reopened.query_by_vector(FakeEmbeddings(dimensions=128).embed_query("strategy summary"), k=1)[0]["title"] == "Strategy"
+
+def test_same_model_keeps_the_index(rag_module, monkeypatch):
+    module, config = rag_module
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "model-a")
+    store = module.RAGService()
+    store.vector_store.add_texts(["account summary"], metadatas=[{"id": "doc-1"}], ids=["doc-1"])
+    embedding = store.vector_store._collection.get(include=["embeddings"])["embeddings"][0]
+
+    reopened = module.RAGService()
+    assert list(reopened.vector_store._collection.get(include=["embeddings"])["embeddings"][0]) == list(embedding)
@@ -0,0 +1,62 @@
+import time
+
+from services.reranker import Reranker
+
+class StubCrossEncoder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.pairs = []
+        self.batches = []
+
+    def predict(self, pairs):
+        time.sleep(self.delay * len(pairs))
+        self.pairs.extend(pairs)
+        self.batches.append(len(pairs))
+        return [len(set(query.split()) & set(text.split())) for query, text in pairs]
+
+DOCUMENTS = [
+    {"title": "Strategy", "summary": "moving average strategy"},
+    {"title": "Account", "summary": "account balance withdraw"},
+    {"title": "Engine", "summary": "engine wires account and strategy"},
+]
+
+def make_reranker(model, **kwargs):
+    reranker = Reranker(model_name="stub", **kwargs)
+    reranker._model = model
+    return reranker
+
+def test_orders_by_cross_encoder_score():
+    reranker = make_reranker(StubCrossEncoder(), budget_ms=1000)
+    ranked = reranker.rerank("account balance withdraw", DOCUMENTS)
+    assert [d["title"] for d in ranked] == ["Account", "Engine", "Strategy"]
+
+def test_batches_are_sized_to_fit_the_budget():
+    # 30ms per pair and a 100ms budget: a 1-pair probe, then only as many pairs as still fit
+    model = StubCrossEncoder(delay=0.03)
+    reranker = make_reranker(model, budget_ms=100, batch_size=8)
+    documents = [{"title": str(i), "summary": f"doc {i}"} for i in range(10)]
+
+    start = time.perf_counter()
+    ranked = reranker.rerank("doc", documents)
+    assert time.perf_counter() - start < 0.2
+    assert model.batches[0] == 1
+    assert 2 <= len(model.pairs) < len(documents)
+    # Unscored candidates keep their incoming order at the end
+    assert ranked[len(model.pairs):] == documents[len(model.pairs):]
+
+def test_known_cost_over_budget_scores_nothing():
+    model = StubCrossEncoder()
+    reranker = make_reranker(model, budget_ms=10)
+    reranker.pair_seconds = 1.0
+    assert reranker.rerank("account", DOCUMENTS) == DOCUMENTS
+    assert model.pairs == []
+
+def test_rerank_never_loads_the_model():
+    reranker = Reranker(model_name="stub")
+    assert reranker.rerank("account", DOCUMENTS) == DOCUMENTS
+    assert reranker._model is None
+
+def test_unavailable_model_keeps_order():
+    reranker = Reranker(model_name="")
+    assert reranker.load() is False
+    assert reranker.rerank("account", DOCUMENTS) == DOCUMENTS
@@ -0,0 +1,120 @@
+import gzip
+import json
+import uuid
+
+import chromadb
+import pytest
+
+from services.snapshot_service import SnapshotService
+
+def make_collection(model="test-model"):
+    client = chromadb.EphemeralClient()
+    return client.create_collection(f"kb-{uuid.uuid4().hex}", metadata={"embedding_model": model}, embedding_function=None)
+
+def add(collection, record_id, summary, vector):
+    collection.upsert(
+        ids=[record_id],
+        documents=[summary],
+        metadatas=[{"title": record_id.upper(), "full_content": f"raw {summary}", "type": "summary"}],
+        embeddings=[vector]
+    )
+
+def test_export_import_round_trip(tmp_path):
+    service = SnapshotService()
+    source = make_collection()
+    add(source, "b", "account summary", [0.1, 0.2, 0.3])
+    add(source, "a", "market data summary", [0.4, 0.5, 0.6])
+
+    path = str(tmp_path / "kb.snap.gz")
+    assert service.export_snapshot(source, path) == 2
+
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline())
+    assert header["version"] == 1
+    assert header["embedding_model"] == "test-model"
+    assert header["dimensions"] == 3
+    assert header["ids"] == ["a", "b"]
+
+    target = make_collection()
+    assert service.import_snapshot(target, path) == {"upserted": 2, "deleted": 0}
+    restored = target.get(ids=["a"], include=["documents", "metadatas", "embeddings"])
+    assert restored["documents"] == ["market data summary"]
+    assert restored["metadatas"][0]["full_content"] == "raw market data summary"
+    assert list(restored["embeddings"][0]) == pytest.approx([0.4, 0.5, 0.6])
+
+def test_identical_contents_produce_identical_files(tmp_path):
+    service = SnapshotService()
+    collection = make_collection()
+    add(collection, "a", "summary", [1.0, 0.0])
+    service.export_snapshot(collection, str(tmp_path / "one.gz"))
+    service.export_snapshot(collection, str(tmp_path / "two.gz"))
+    assert (tmp_path / "one.gz").read_bytes() == (tmp_path / "two.gz").read_bytes()
+
+def test_diff_and_incremental_apply(tmp_path):
+    service = SnapshotService()
+    collection = make_collection()
+    add(collection, "a", "unchanged", [1.0, 0.0])
+    add(collection, "b", "old text", [0.0, 1.0])
+    add(collection, "c", "removed later", [0.5, 0.5])
+    old = str(tmp_path / "old.gz")
+    service.export_snapshot(collection, old)
+
+    replica = make_collection()
+    service.import_snapshot(replica, old)
+
+    add(collection, "b", "new text", [0.0, 1.0])
+    add(collection, "d", "added", [0.2, 0.8])
+    collection.delete(ids=["c"])
+    new = str(tmp_path / "new.gz")
+    service.export_snapshot(collection, new)
+
+    delta = str(tmp_path / "delta.gz")
+    assert service.diff_snapshots(old, new, delta) == {"changed": 2, "deleted": 1}
+    assert service.import_snapshot(replica, delta) == {"upserted": 2, "deleted": 1}
+
+    result = replica.get(include=["documents"])
+    assert dict(zip(result["ids"], result["documents"])) == {"a": "unchanged", "b": "new text", "d": "added"}
+
+def test_delta_requires_matching_base(tmp_path):
+    service = SnapshotService()
+    collection = make_collection()
+    add(collection, "a", "first", [1.0, 0.0])
+    old = str(tmp_path / "old.gz")
+    service.export_snapshot(collection, old)
+    add(collection, "b", "second", [0.0, 1.0])
+    new = str(tmp_path / "new.gz")
+    service.export_snapshot(collection, new)
+    delta = str(tmp_path / "delta.gz")
+    service.diff_snapshots(old, new, delta)
+
+    # Never loaded the base snapshot
+    replica = make_collection()
+    add(replica, "z", "unrelated", [0.5, 0.5])
+    with pytest.raises(ValueError, match="--force"):
+        service.import_snapshot(replica, delta)
+    assert replica.get()["ids"] == ["z"]
+
+    assert service.import_snapshot(replica, delta, force=True) == {"upserted": 1, "deleted": 0}
+    assert sorted(replica.get()["ids"]) == ["b", "z"]
+
+def test_replace_removes_records_missing_from_snapshot(tmp_path):
+    service = SnapshotService()
+    source = make_collection()
+    add(source, "a", "kept", [1.0, 0.0])
+    path = str(tmp_path / "kb.gz")
+    service.export_snapshot(source, path)
+
+    target = make_collection()
+    add(target, "stale", "stale", [0.0, 1.0])
+    assert service.import_snapshot(target, path, replace=True) == {"upserted": 1, "deleted": 1}
+    assert target.get()["ids"] == ["a"]
+
+def test_import_rejects_other_embedding_model(tmp_path):
+    service = SnapshotService()
+    source = make_collection("model-a")
+    add(source, "a", "text", [1.0, 0.0])
+    path = str(tmp_path / "kb.gz")
+    service.export_snapshot(source, path)
+
+    with pytest.raises(ValueError, match="re-ingest"):
+        service.import_snapshot(make_collection("model-b"), path)
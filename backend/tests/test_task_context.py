@@ -0,0 +1,131 @@
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+
+DOCUMENTS = [
+    ("Market Data Module", "market data feed csv price subscribe"),
+    ("Account Module", "account balance deposit withdraw positions"),
+    ("Strategy Module", "strategy moving average signal buy sell"),
+]
+
+class StubRAG:
+    def __init__(self):
+        self.embeddings = FakeEmbeddings()
+        self.embed_calls = 0
+        self.query_calls = 0
+
+    def embed_query(self, text):
+        self.embed_calls += 1
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts):
+        self.embed_calls += 1
+        return self.embeddings.embed_documents(texts)
+
+    def query_by_vector(self, embedding, k=3):
+        return self.query_by_vectors([embedding], k=k)[0]
+
+    def query_by_vectors(self, embeddings, k=3):
+        self.query_calls += 1
+        results = []
+        for embedding in embeddings:
+            documents = [
+                {"id": title, "title": title, "summary": f"{title} summary", "full_content": content, "embedding": self.embeddings.embed_query(content)}
+                for title, content in DOCUMENTS
+            ]
+            documents.sort(key=lambda d: -sum(a * b for a, b in zip(embedding, d["embedding"])))
+            results.append(documents[:k])
+        return results
+
+class StubGateway:
+    def __init__(self, response):
+        self.response = response
+        self.prompts = []
+
+    def invoke(self, prompt, workspace_id=None):
+        self.prompts.append(prompt)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+class ReverseReranker:
+    def rerank(self, query, documents):
+        return list(reversed(documents))
+
+@pytest.fixture
+def task_context(monkeypatch, fake_backend):
+    from agents import task_context
+    rag = StubRAG()
+    monkeypatch.setattr(task_context, "rag_service", rag)
+    return task_context, rag
+
+def test_retrieves_once_and_memoizes(task_context):
+    module, rag = task_context
+    context = module.TaskContext("Implement Trading Engine Core", k=3)
+    assert rag.query_calls == 1
+
+    context.retrieve("Implement Trading Engine Core", 3)
+    context.step_documents("Create account with balance")
+    context.step_documents("Create account with balance")
+    # One narrow retrieval for the step, reused on the second call
+    assert rag.query_calls == 2
+    # Task text and the step text, each embedded once
+    assert rag.embed_calls == 2
+
+def test_step_can_use_a_document_outside_the_task_top_k(task_context):
+    module, rag = task_context
+    context = module.TaskContext("market data feed csv", k=1, step_k=1)
+    assert [d["title"] for d in context.documents] == ["Market Data Module"]
+    documents = context.step_documents("Create src/strategy.py with moving average signal")
+    assert [d["title"] for d in documents] == ["Strategy Module"]
+
+def test_step_context_is_narrowed_to_relevant_documents(task_context):
+    module, _ = task_context
+    context = module.TaskContext("Implement Trading Engine Core", k=3)
+    step_context = context.step_context("Create src/account.py with account balance deposit withdraw")
+    assert "Account Module" in step_context
+    assert "Market Data Module" not in step_context
+    assert len(step_context) < len(context.full_context())
+
+def test_prefix_is_stable_and_shared(task_context):
+    module, _ = task_context
+    context = module.TaskContext("Implement Trading Engine Core")
+    assert context.prefix.startswith(module.SYSTEM_PROMPT)
+    for title, _ in DOCUMENTS:
+        assert f"{title} summary" in context.prefix
+    # Full specifications never go into the shared prefix
+    assert "deposit withdraw" not in context.prefix
+    prefix = context.prefix
+    context.step_context("strategy moving average")
+    assert context.prefix == prefix
+
+def test_multi_mode_batches_subqueries_and_deduplicates(task_context, monkeypatch):
+    module, rag = task_context
+    gateway = StubGateway("1. account balance withdraw\n- strategy moving average\n\naccount balance withdraw")
+    monkeypatch.setattr(module, "llm_gateway", gateway)
+    monkeypatch.setattr(module.reranker, "rerank", lambda query, documents: documents)
+
+    context = module.TaskContext("market data feed", k=1, mode="multi")
+    # Task plus two distinct sub-queries: one batched embedding call and one search
+    assert rag.embed_calls == 1
+    assert rag.query_calls == 1
+    assert [d["title"] for d in context.documents] == ["Market Data Module", "Account Module", "Strategy Module"]
+    assert context.retrieve("strategy moving average", 1)[0]["title"] == "Strategy Module"
+    assert rag.query_calls == 1
+
+def test_multi_mode_reranks_and_caps_documents(task_context, monkeypatch):
+    module, _ = task_context
+    monkeypatch.setattr(module, "llm_gateway", StubGateway("account balance\nstrategy moving average"))
+    monkeypatch.setattr(module, "reranker", ReverseReranker())
+    monkeypatch.setattr(module.config, "RETRIEVAL_MAX_DOCUMENTS", 2)
+
+    context = module.TaskContext("market data feed", k=1, mode="multi")
+    assert [d["title"] for d in context.documents] == ["Strategy Module", "Account Module"]
+
+def test_multi_mode_falls_back_to_task_query(task_context, monkeypatch):
+    module, rag = task_context
+    monkeypatch.setattr(module, "llm_gateway", StubGateway(RuntimeError("rate limited")))
+    monkeypatch.setattr(module.reranker, "rerank", lambda query, documents: documents)
+
+    context = module.TaskContext("account balance", k=1, mode="multi")
+    assert [d["title"] for d in context.documents] == ["Account Module"]
@@ -0,0 +1,46 @@
+from services.test_selector import TestSelector
+
+def make_repo(tmp_path):
+    files = {
+        "src/__init__.py": "",
+        "src/market_data.py": "class MarketDataProvider:\n    pass\n",
+        "src/account.py": "class Account:\n    pass\n",
+        "src/engine.py": "from src.market_data import MarketDataProvider\nfrom .account import Account\n",
+        "tests/__init__.py": "",
+        "tests/test_market_data.py": "from src.market_data import MarketDataProvider\n",
+        "tests/test_account.py": "import src.account\n",
+        "tests/test_engine.py": "from src import engine\n",
+    }
+    for path, content in files.items():
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+    return str(tmp_path)
+
+def test_dependency_map(tmp_path):
+    repo = make_repo(tmp_path)
+    deps = TestSelector().build_dependency_map(repo)
+    assert deps["src/engine.py"] == {"src/__init__.py", "src/market_data.py", "src/account.py"}
+    assert deps["tests/test_engine.py"] == {"src/__init__.py", "src/engine.py"}
+
+def test_select_tests_follows_transitive_imports(tmp_path):
+    repo = make_repo(tmp_path)
+    selector = TestSelector()
+    assert selector.select_tests(repo, ["src/market_data.py"]) == ["tests/test_engine.py", "tests/test_market_data.py"]
+    assert selector.select_tests(repo, ["src/account.py"]) == ["tests/test_account.py", "tests/test_engine.py"]
+    assert selector.select_tests(repo, ["tests/test_account.py"]) == ["tests/test_account.py"]
+    assert selector.select_tests(repo, ["README.md"]) == []
+
+def test_package_init_affects_all_importers(tmp_path):
+    repo = make_repo(tmp_path)
+    selected = TestSelector().select_tests(repo, ["src/__init__.py"])
+    assert selected == ["tests/test_account.py", "tests/test_engine.py", "tests/test_market_data.py"]
+
+def test_shard_balances_and_covers_all_files(tmp_path):
+    repo = make_repo(tmp_path)
+    selector = TestSelector()
+    test_files = selector.find_test_files(repo)
+    shards = selector.shard(test_files, repo, shards=2)
+    assert len(shards) == 2
+    assert sorted(f for shard in shards for f in shard) == sorted(test_files)
+    assert selector.shard([], repo, shards=4) == []
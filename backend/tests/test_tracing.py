@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from services.tracing import Tracer
+
+def test_spans_are_collected_under_trace():
+    tracer = Tracer()
+    with tracer.trace("task-1"):
+        with tracer.span("agent.create_plan"):
+            tracer.record_tokens(100, 20)
+        with tracer.span("agent.run_test") as span:
+            span["outcome"] = "failed"
+
+    trace = tracer.get_trace("task-1")
+    assert [s["name"] for s in trace["spans"]] == ["agent.create_plan", "agent.run_test"]
+    assert trace["spans"][0]["input_tokens"] == 100
+    assert trace["spans"][0]["output_tokens"] == 20
+    assert trace["spans"][1]["outcome"] == "failed"
+    assert trace["duration"] is not None
+    assert tracer.get_trace("missing") is None
+
+def test_nested_spans_and_errors():
+    tracer = Tracer()
+    with tracer.trace("task-2"):
+        with pytest.raises(ValueError):
+            with tracer.span("agent.fix_code"):
+                with tracer.span("rag.query_knowledge"):
+                    raise ValueError("boom")
+
+    inner, outer = tracer.get_trace("task-2")["spans"]
+    assert inner["parent"] == "agent.fix_code"
+    assert inner["outcome"] == outer["outcome"] == "error"
+    assert inner["attributes"]["error"] == "boom"
+
+def test_traced_decorator_marks_false_as_failed():
+    tracer = Tracer()
+
+    @tracer.traced("git.commit_changes")
+    def commit(ok):
+        return ok
+
+    with tracer.trace("task-3"):
+        commit(True)
+        commit(False)
+    assert [s["outcome"] for s in tracer.get_trace("task-3")["spans"]] == ["ok", "failed"]
+
+def test_traces_do_not_leak_across_threads():
+    tracer = Tracer()
+
+    def other_thread():
+        with tracer.span("rag.generate_llmtxt"):
+            pass
+
+    with tracer.trace("task-4"):
+        t = threading.Thread(target=other_thread)
+        t.start()
+        t.join()
+    assert tracer.get_trace("task-4")["spans"] == []
+
+def test_old_traces_are_evicted():
+    tracer = Tracer(max_traces=2)
+    for i in range(3):
+        with tracer.trace(f"task-{i}"):
+            pass
+    assert tracer.get_trace("task-0") is None
+    assert tracer.get_trace("task-2") is not None
+
+def test_render_metrics():
+    tracer = Tracer()
+    with tracer.span("agent.generate_code"):
+        tracer.record_tokens(10, 5)
+    with tracer.span("agent.generate_code"):
+        pass
+
+    text = tracer.render_metrics()
+    assert "# TYPE gts_stage_duration_seconds histogram" in text
+    assert 'gts_stage_duration_seconds_bucket{stage="agent.generate_code",outcome="ok",le="+Inf"} 2' in text
+    assert 'gts_stage_duration_seconds_count{stage="agent.generate_code",outcome="ok"} 2' in text
+    assert 'gts_stage_tokens_total{stage="agent.generate_code",direction="input"} 10' in text
+    assert 'gts_stage_tokens_total{stage="agent.generate_code",direction="output"} 5' in text
@@ -0,0 +1,208 @@
+import os
+import time
+import subprocess
+
+import pytest
+
+from services.workspace_manager import WorkspaceManager
+
+def git(cwd, *args):
+    return subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@localhost", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+@pytest.fixture
+def origin(tmp_path):
+    path = tmp_path / "origin"
+    path.mkdir()
+    (path / "README.md").write_text("origin\n")
+    git(path, "init", "-q")
+    git(path, "add", ".")
+    git(path, "commit", "-q", "-m", "Initial commit")
+    return str(path)
+
+def make_manager(tmp_path, **kwargs):
+    kwargs.setdefault("user_quota_bytes", 10 ** 9)
+    kwargs.setdefault("global_quota_bytes", 10 ** 9)
+    kwargs.setdefault("idle_seconds", 0)
+    return WorkspaceManager(root=str(tmp_path / "workspaces"), **kwargs)
+
+def test_create_registers_and_persists(tmp_path, origin):
+    manager = make_manager(tmp_path)
+    workspace = manager.create("Demo", origin, owner="alice")
+    assert os.path.exists(os.path.join(workspace["repo_path"], "README.md"))
+
+    reloaded = make_manager(tmp_path)
+    assert reloaded.workspaces[workspace["id"]]["owner"] == "alice"
+
+def test_evicts_lru_until_under_global_quota(tmp_path, origin):
+    manager = make_manager(tmp_path)
+    old = manager.create("Old", origin)
+    new = manager.create("New", origin)
+    old["last_access"] = time.time() - 100
+
+    manager.enforce_quotas()
+    # Room for the new workspace plus the old one's git objects, which stay behind in its mirror
+    manager.global_quota_bytes = new["size_bytes"] + old["git_bytes"]
+    assert manager.enforce_quotas() == [old["id"]]
+    assert old["state"] == "evicted"
+    assert not os.path.exists(old["repo_path"])
+    assert new["state"] == "active"
+
+def test_per_user_quota_only_evicts_that_users_workspaces(tmp_path, origin):
+    manager = make_manager(tmp_path)
+    alice_old = manager.create("A1", origin, owner="alice")
+    alice_new = manager.create("A2", origin, owner="alice")
+    bob = manager.create("B1", origin, owner="bob")
+    alice_old["last_access"] = 1
+    bob["last_access"] = 0
+
+    manager.enforce_quotas()
+    manager.user_quota_bytes = alice_new["size_bytes"] + alice_old["git_bytes"]
+    assert manager.enforce_quotas() == [alice_old["id"]]
+    assert bob["state"] == alice_new["state"] == "active"
+
+def test_busy_and_recent_workspaces_are_not_evicted(tmp_path, origin):
+    manager = make_manager(tmp_path, global_quota_bytes=0, idle_seconds=3600)
+    recent = manager.create("Recent", origin)
+    assert manager.enforce_quotas() == []
+
+    manager.idle_seconds = 0
+    with manager.use(recent["id"]):
+        assert manager.enforce_quotas() == []
+    assert manager.enforce_quotas() == [recent["id"]]
+
+def test_rehydrate_restores_committed_branches(tmp_path, origin):
+    manager = make_manager(tmp_path, global_quota_bytes=0)
+    workspace = manager.create("Feature", origin)
+    repo = workspace["repo_path"]
+    default_branch = git(repo, "rev-parse", "--abbrev-ref", "HEAD")
+    git(repo, "checkout", "-q", "-b", "feature/engine")
+    with open(os.path.join(repo, "engine.py"), "w") as f:
+        f.write("ENGINE = True\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "Add engine")
+
+    assert manager.enforce_quotas() == [workspace["id"]]
+    assert not os.path.exists(repo)
+
+    with manager.use(workspace["id"]) as repo_path:
+        assert repo_path == repo
+        assert git(repo, "rev-parse", "--abbrev-ref", "HEAD") == "feature/engine"
+        assert os.path.exists(os.path.join(repo, "engine.py"))
+        assert default_branch in git(repo, "branch", "--format=%(refname:short)").split()
+        assert git(repo, "remote", "get-url", "origin") == origin
+    assert workspace["state"] == "active"
+
+def test_rehydration_drops_the_mirror(tmp_path, origin):
+    manager = make_manager(tmp_path, global_quota_bytes=0)
+    workspace = manager.create("Feature", origin)
+    manager.enforce_quotas()
+    mirror = manager._mirror_path(workspace["id"])
+    assert os.path.isdir(mirror)
+    assert workspace["mirror_bytes"] > 0
+
+    with manager.use(workspace["id"]):
+        pass
+    assert not os.path.exists(mirror)
+    assert workspace["mirror_bytes"] == 0
+
+def test_mirrors_count_against_owner_quota(tmp_path, origin):
+    manager = make_manager(tmp_path)
+    evicted = manager.create("Evicted", origin, owner="alice")
+    active = manager.create("Active", origin, owner="alice")
+    evicted["last_access"] = time.time() - 100
+    manager.enforce_quotas()
+    manager.global_quota_bytes = active["size_bytes"] + evicted["git_bytes"]
+    assert manager.enforce_quotas() == [evicted["id"]]
+    assert evicted["mirror_bytes"] > 0
+
+    # The working copy fits the quota alone, but not alongside the other workspace's mirror
+    manager.global_quota_bytes = 10 ** 9
+    manager.user_quota_bytes = active["size_bytes"] + evicted["mirror_bytes"] - 1
+    assert manager.enforce_quotas() == [active["id"]]
+
+def test_eviction_plan_counts_the_mirrored_git_objects(tmp_path, origin, caplog):
+    manager = make_manager(tmp_path)
+    old = manager.create("Old", origin)
+    new = manager.create("New", origin)
+    old["last_access"] = time.time() - 100
+    manager.enforce_quotas()
+    assert 0 < old["git_bytes"] < old["size_bytes"]
+
+    # Evicting the old workspace alone would fit only if it freed its .git as well
+    manager.global_quota_bytes = new["size_bytes"] + old["git_bytes"] - 1
+    assert manager._eviction_plan([old, new]) == [old, new]
+
+    with manager.use(new["id"]):
+        assert manager._eviction_plan([old, new]) == [old]
+    assert "still exceeded" in caplog.text
+
+def test_delete_removes_working_copy_and_mirror(tmp_path, origin):
+    manager = make_manager(tmp_path, global_quota_bytes=0)
+    kept = manager.create("Kept", origin)
+    workspace = manager.create("Gone", origin)
+    manager.enforce_quotas()
+
+    with manager.use(kept["id"]):
+        assert manager.delete(kept["id"]) is False
+    assert manager.delete(workspace["id"]) is True
+    assert not os.path.exists(os.path.join(manager.root, workspace["id"]))
+    assert not os.path.exists(manager._mirror_path(workspace["id"]))
+    assert workspace["id"] not in make_manager(tmp_path).workspaces
+
+def test_transient_states_are_never_persisted_and_recovered_on_load(tmp_path, origin):
+    manager = make_manager(tmp_path)
+    evicting = manager.create("Evicting", origin)
+    gone = manager.create("Gone", origin)
+    evicting["state"] = "evicting"
+    gone["state"] = "rehydrating"
+    manager._save()
+    with open(manager.registry_path) as f:
+        assert "evicting" not in f.read()
+
+    # Simulate a crash with the transient states on disk, one working copy already deleted
+    import json
+    import shutil
+    with open(manager.registry_path) as f:
+        records = json.load(f)
+    records[evicting["id"]]["state"] = "evicting"
+    records[gone["id"]]["state"] = "rehydrating"
+    with open(manager.registry_path, "w") as f:
+        json.dump(records, f)
+    shutil.rmtree(gone["repo_path"])
+
+    reloaded = make_manager(tmp_path)
+    assert reloaded.workspaces[evicting["id"]]["state"] == "active"
+    assert reloaded.workspaces[gone["id"]]["state"] == "evicted"
+
+def test_rehydration_does_not_hold_the_manager_lock(tmp_path, origin, monkeypatch):
+    import threading
+    from services import workspace_manager as module
+
+    manager = make_manager(tmp_path, global_quota_bytes=0)
+    workspace = manager.create("Slow", origin)
+    manager.enforce_quotas()
+
+    started = threading.Event()
+    release = threading.Event()
+    restore = module.git_service.restore_from_mirror
+
+    def slow_restore(*args):
+        started.set()
+        release.wait(10)
+        return restore(*args)
+
+    monkeypatch.setattr(module.git_service, "restore_from_mirror", slow_restore)
+
+    def use():
+        with manager.use(workspace["id"]):
+            pass
+
+    thread = threading.Thread(target=use)
+    thread.start()
+    assert started.wait(10)
+    assert workspace["state"] == "rehydrating"
+    # Other workspaces can be created while the clone runs
+    assert manager.create("Other", origin) is not None
+    release.set()
+    thread.join(10)
+    assert workspace["state"] == "active"